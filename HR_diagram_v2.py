@@ -26,17 +26,22 @@ within the HR Diagram simulation to ensure a unique dataset.  Reddening is not i
 """
 
 import tkinter as tk
-import pandas as pd
 import numpy as np 
+from scipy.spatial import cKDTree
+from cluster_catalog import ClusterCatalog
+from cluster_sim import random_positions, random_distmod, add_noise
+from canvas_table import CanvasTable
 
 
 def read_stars():
     global clustervar, ds, starid, x, y, Bmag, Vmag, Rmag, framewidth, frameheight
 
     # read in magnitude data for the cluster.  For simulated clusters, these are absolute mags.
-    Bmag = pd.to_numeric(ds[clustervar]['B mag'])
-    Vmag = pd.to_numeric(ds[clustervar]['V mag'])
-    Rmag = pd.to_numeric(ds[clustervar]['R mag'])    
+    # The columns are already numeric (see cluster_catalog.py); astype makes copies
+    # so the noise added in draw_stars() does not change the catalog.
+    Bmag = ds[clustervar]['B mag'].astype(float)
+    Vmag = ds[clustervar]['V mag'].astype(float)
+    Rmag = ds[clustervar]['R mag'].astype(float)    
     N = len(Vmag)
    
     try:   # get star ID numbers, if available
@@ -46,35 +51,85 @@ def read_stars():
 
     
     try:  # first look for x+y coordinates on pre-determined scale (values between 0-600)
-        x = pd.to_numeric(ds[clustervar]['X'])
-        y = pd.to_numeric(ds[clustervar]['Y'])
+        x = ds[clustervar]['X'].astype(float)
+        y = ds[clustervar]['Y'].astype(float)
     
     except:  
         try:  # if x+y not available, look for ra+dec coordinates
-            ra = pd.to_numeric(ds[clustervar]['RA (J2000)'])
-            dec = pd.to_numeric(ds[clustervar]['Dec (J2000)'])
+            ra = ds[clustervar]['RA (J2000)'].astype(float)
+            dec = ds[clustervar]['Dec (J2000)'].astype(float)
             xscale = (max(ra) - min(ra) ) * 1.1 / framewidth
             yscale = (max(dec) - min(dec) ) *  1.1 / frameheight
             scale = max([xscale, yscale])
             x = framewidth - (ra - min(ra) ) / scale + (framewidth - framewidth/1.1)/2
             y = frameheight - (dec - min(dec)) / scale  + (frameheight - frameheight/1.1)/2
         
-        except:  # For simulated clusters, generate random positions
-            mu, sigma = 0, frameheight/4
-            r = np.random.normal(mu, sigma, N)
-            theta = np.random.uniform(0, 2*np.pi, N)
-            x = r*np.cos(theta)+ framewidth/2
-            y = r*np.sin(theta)+frameheight/2
+        except:  # For simulated clusters, generate random positions (see cluster_sim.py)
+            x, y = random_positions(rng, N, framewidth, frameheight)
  
             # also for simulated clusters, add random distance modulus
-            distmod = np.random.uniform(0.5, 10, 1)
-            Bmag = Bmag + distmod[0]
-            Vmag = Vmag + distmod[0]
-            Rmag = Rmag + distmod[0]
+            distmod = random_distmod(rng)
+            Bmag = Bmag + distmod
+            Vmag = Vmag + distmod
+            Rmag = Rmag + distmod
+
+
+# index of star positions for picking stars; rebuilt whenever a cluster is loaded
+def index_stars():
+    global x, y, starxy, starindex
+    starxy = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    starindex = cKDTree(starxy)
+
+
+# stars whose disks (plus a halo of a few pixels) cover a point, nearest first
+def find_stars(px, py, halo=2):
+    global starxy, starindex, startable
+    starradius = startable.data['radius']
+    if len(starradius) == 0 or len(starxy) == 0:   # no stars drawn
+        return np.zeros(0, dtype=int)
+    near = starindex.query_ball_point([px, py], starradius.max() + halo)
+    near = np.array(near, dtype=int)
+    dist = np.hypot(starxy[near, 0] - px, starxy[near, 1] - py)
+    inside = dist <= starradius[near] + halo
+    return near[inside][np.argsort(dist[inside])]
+
+
+# draw all stars into one image instead of one canvas item per star, for large
+# clusters.  Stars are stamped as disks with a black outline, largest first so
+# that faint stars stay visible; returns the canvas item of the image.
+def draw_raster(xs, ys, radius, color):
+    global skyimage
+    rgb = np.zeros((frameheight, framewidth, 3), dtype=np.uint8)
+    fill = np.array(sky.winfo_rgb(color)) // 256    # 16-bit Tk color to 8-bit
+    good = np.isfinite(xs) & np.isfinite(ys)
+    ix = np.rint(xs[good]).astype(np.int32)
+    iy = np.rint(ys[good]).astype(np.int32)
+    radius = radius[good]
+
+    # stars of one radius are stamped in chunks, to keep the index arrays small
+    pixels = rgb.reshape(-1, 3)
+    chunk = 10000
+    for r in np.unique(radius)[::-1]:
+        sel = np.nonzero(radius == r)[0]
+        dy, dx = np.mgrid[-r:r+1, -r:r+1]
+        dist = np.hypot(dx, dy)
+        for first in range(0, len(sel), chunk):
+            cx = ix[sel[first:first+chunk], np.newaxis]
+            cy = iy[sel[first:first+chunk], np.newaxis]
+            for disk, shade in ((dist <= r, 0), (dist <= r - 1, fill)):
+                px = (cx + dx[disk]).ravel()
+                py = (cy + dy[disk]).ravel()
+                inside = (px >= 0) & (px < framewidth) & (py >= 0) & (py < frameheight)
+                pixels[py[inside]*framewidth + px[inside]] = shade
+
+    header = ('P6 %d %d 255\n' % (framewidth, frameheight)).encode()
+    skyimage = tk.PhotoImage(width=framewidth, height=frameheight, \
+                             data=header + rgb.tobytes(), format='PPM')
+    return sky.create_image(0, 0, image=skyimage, anchor='nw')
 
 
 def draw_stars():
-    global starid, x, y, Bmag, Vmag, Rmag, filtervar, fillvar, stars
+    global starid, x, y, Bmag, Vmag, Rmag, filtervar, fillvar, stars, startable
     sky.bind("<Button-1>", starcoords)
 
     # see more color options at 
@@ -95,43 +150,59 @@ def draw_stars():
     # create star's graphics in simulation
     # size is assigned based on dynamic range of magnitudes
     # random noise included with logarithmic dependence on magnitude
+    stepsize = (mag.max()-mag.min())/6
+    mag[:] = add_noise(rng, mag.to_numpy())
+    mags = mag.to_numpy()
+    steps = mag.min() + stepsize*np.arange(1, 6)
+    radius = 7 - np.digitize(mags, steps, right=True)
+    xs = np.asarray(x)
+    ys = np.asarray(y)
+
+    # large clusters are drawn as a single image; stars are then picked
+    # with the position index alone
+    if len(mags) > rastermin:
+        stars = [draw_raster(xs.astype(float), ys.astype(float), radius, fillvar)]
+        startable.set(None, star=np.asarray(starid), x=xs, y=ys, mag=mags.copy(), radius=radius)
+        return
+
     stars = []
-    stepsize = (max(mag)-min(mag))/6
-    for i in range(len(starid)):
-        noise = np.random.uniform(-np.log(1 + (mag[i]-min(mag))*.03), np.log(1 + (mag[i]-min(mag))*.03), 1)
-        mag[i] = mag[i]+noise[0]
-        radius=2  
-        if mag[i] <= min(mag)+stepsize*5: radius=3
-        if mag[i] <= min(mag)+stepsize*4: radius=4
-        if mag[i] <= min(mag)+stepsize*3: radius=5
-        if mag[i] <= min(mag)+stepsize*2: radius=6
-        if mag[i] <= min(mag)+stepsize: radius=7
-       
-        tmp = sky.create_oval(x[i]-radius, y[i]-radius, x[i]+radius, y[i]+radius, \
-            fill=fillvar, \
-            tags = (str(starid[i]),  f"{mag[i]:.2f}") )
+    for i in range(len(mags)):
+        tmp = sky.create_oval(xs[i]-radius[i], ys[i]-radius[i], xs[i]+radius[i], ys[i]+radius[i], \
+            fill=fillvar)
         stars.append(tmp)
+    # star ID, position and magnitude of every star drawn (see canvas_table.py)
+    startable.set(stars, star=np.asarray(starid), x=xs, y=ys, mag=mags.copy(), radius=radius)
         
 
 def delete_stars():
     global starid, x, y, Bmag, Vmag, Rmag, filtervar, stars
-    for i in range(len(starid)): sky.delete(stars[i])
+    for item in stars: sky.delete(item)
 
 
-# get star coords and magnitudes when clicked
-# still bugs when 2 objects overlap  :(
+# get star coords and magnitudes when clicked.  When several stars overlap,
+# clicking again at the same place steps through them, nearest first.
 def starcoords(event):
+    global startable, lastpick
     cursorx = event.x
     cursory = event.y
-    #item = sky.find_overlapping(cursorx-3, cursory-3, cursorx+3, cursory+3)
-    item = sky.find_closest(cursorx, cursory, halo=2)
-    if sky.gettags(item) != ():
-        starlabel.configure(text="Star ID: "+sky.gettags(item)[0], \
+    picked = find_stars(cursorx, cursory)
+    if len(picked) > 0:
+        k = 0
+        if lastpick is not None and list(picked) == list(lastpick[0]) and \
+           abs(cursorx - lastpick[1]) <= 2 and abs(cursory - lastpick[2]) <= 2:
+            k = (lastpick[3] + 1) % len(picked)
+        lastpick = (picked, cursorx, cursory, k)
+        star = startable.record(picked[k])
+        text = "Star ID: "+str(star['star'])
+        if len(picked) > 1:
+            text = text + "  (%d of %d overlapping stars;\nclick again for the next)" % (k+1, len(picked))
+        starlabel.configure(text=text, \
                             font=("Ariel", 16))
         maglabel.configure(text="Apparent magnitude in filter " + filtervar + " = " + \
-                           sky.gettags(item)[1], \
+                           f"{star['mag']:.2f}", \
                            font=("Ariel", 16))
     else:
+        lastpick = None
         starlabel.configure(text="No star at this location.", \
                             font=("Ariel", 16))
         maglabel.configure(text=" ")
@@ -153,6 +224,7 @@ def set_cluster():
     #print ('Changing to cluster '+clustervar)
     delete_stars()
     read_stars()
+    index_stars()
     draw_stars()
     starlabel.configure(text="Click a star to measure its apparent magnitude!", \
                             font=("Ariel", 16))
@@ -167,6 +239,8 @@ window = tk.Tk()
 window.title("Hertzsprung-Russell Diagram of a Star Cluster")
 framewidth = 600
 frameheight = 600
+rastermin = 5000    # clusters with more stars are drawn as one image
+rng = np.random.default_rng()   # positions, distances and noise of simulated clusters
 window.geometry(str(framewidth*2)+'x'+str(frameheight))
 
 
@@ -176,9 +250,11 @@ controlframe.grid_propagate(0)
 controlframe.place(x=framewidth, y=0)
 
 
-# read in star data; get list of available clusters from the data file
+# read in star data; get list of available clusters from the data file.
+# The spreadsheet is converted to a faster cache the first time, and clusters
+# are loaded only when selected.
 dir = '/Users/gmcswain/Documents/Lehigh/Teaching/ASTR008/GUIs/HR_Diagram/'
-ds = pd.read_excel(dir+'stardata.xlsx', sheet_name=None)
+ds = ClusterCatalog(dir+'stardata.xlsx')
 clusterlist = []
 for sheet_name in ds.keys():
     clusterlist.append(sheet_name)
@@ -200,19 +276,19 @@ setclusterbtn.place(relx=0.7, rely=row_pos)
 # display default cluster data - necessary before set_cluster() is run
 starid = ds[cluster]['Star ID']
 try: 
-    x = pd.to_numeric(ds[cluster]['X'])
-    y = pd.to_numeric(ds[cluster]['Y'])
+    x = ds[cluster]['X'].astype(float)
+    y = ds[cluster]['Y'].astype(float)
 except:
-    ra = pd.to_numeric(ds[cluster]['RA (J2000)'])
-    dec = pd.to_numeric(ds[cluster]['Dec (J2000)'])
+    ra = ds[cluster]['RA (J2000)'].astype(float)
+    dec = ds[cluster]['Dec (J2000)'].astype(float)
     xscale = (max(ra) - min(ra) ) * 1.1 / framewidth
     yscale = (max(dec) - min(dec) ) *  1.1 / frameheight
     scale = max([xscale, yscale])
     x = framewidth - (ra - min(ra) ) / scale + (framewidth - framewidth/1.1)/2
     y = frameheight - (dec - min(dec)) / scale  + (frameheight - frameheight/1.1)/2
-Bmag = pd.to_numeric(ds[cluster]['B mag'])
-Vmag = pd.to_numeric(ds[cluster]['V mag'])
-Rmag = pd.to_numeric(ds[cluster]['R mag'])
+Bmag = ds[cluster]['B mag'].astype(float)
+Vmag = ds[cluster]['V mag'].astype(float)
+Rmag = ds[cluster]['R mag'].astype(float)
 
 
 # option to change filter in control panel
@@ -263,6 +339,9 @@ sky = tk.Canvas(skyframe, width=framewidth, height=frameheight)
 sky.config(bg="black")
 sky.place(relx=0, rely=0)
 sky.bind("<Button-1>", starcoords)
+lastpick = None
+startable = CanvasTable('star', 'x', 'y', 'mag', 'radius')
+index_stars()
 draw_stars()
 
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data about the objects drawn on a Tk canvas, kept alongside the canvas.
+
+Instead of storing values as formatted strings in canvas tags and parsing
+them back with gettags() on every click, the simulations keep one row per
+drawn object in a CanvasTable: a numpy array for each column, plus a
+dictionary from canvas item id to row.  Values keep their full precision and
+are only formatted for display, a click is a dictionary lookup, and
+to_dataframe() exports everything that is currently drawn.
+
+Rows can also be added without a canvas item of their own, e.g. for stars
+that are drawn together as one image and picked by position instead.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+
+class CanvasTable:
+    def __init__(self, *columns):
+        self.columns = columns
+        self.clear()
+
+    def clear(self):
+        self.items = np.zeros(0, dtype=int)
+        self.data = {name: np.zeros(0) for name in self.columns}
+        self.rows = {}
+
+    # replace the table with one row per item; items is None if the rows have
+    # no canvas items of their own
+    def set(self, items, **values):
+        self.data = {name: np.asarray(values[name]) for name in self.columns}
+        nrows = len(self.data[self.columns[0]])
+        if items is None:
+            self.items = np.full(nrows, -1)
+            self.rows = {}
+        else:
+            self.items = np.asarray(items, dtype=int)
+            self.rows = dict(zip(self.items.tolist(), range(nrows)))
+
+    # add one row for a canvas item
+    def add(self, item, **values):
+        first = len(self.items) == 0
+        self.rows[item] = len(self.items)
+        self.items = np.append(self.items, item)
+        for name in self.columns:
+            if first:   # take the column's type from its first value
+                self.data[name] = np.array([values[name]])
+            else:
+                self.data[name] = np.append(self.data[name], values[name])
+
+    # remove the rows of deleted canvas items
+    def remove(self, items):
+        keep = ~np.isin(self.items, items)
+        self.items = self.items[keep]
+        self.data = {name: self.data[name][keep] for name in self.columns}
+        self.rows = {item: row for row, item in enumerate(self.items.tolist()) if item >= 0}
+
+    def __contains__(self, item):
+        return item in self.rows
+
+    def __len__(self):
+        return len(self.items)
+
+    # values in one row, by row number
+    def record(self, row):
+        return {name: self.data[name][row] for name in self.columns}
+
+    # values for one canvas item
+    def lookup(self, item):
+        return self.record(self.rows[item])
+
+    def to_dataframe(self):
+        df = pd.DataFrame({name: self.data[name] for name in self.columns})
+        df.insert(0, 'item', self.items)
+        return df
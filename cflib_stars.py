@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The Indo-US library spectra used in the spectral classification lab: the
+unknown stars and the spectral standards, shared by spec_class_v5.py and
+spec_match.py.  Filenames start with each star's published spectral type.
+"""
+
+
+# unknown stars to classify
+starfilelist = ['A5V.hd11636.fits', 'G0V.hd15335.fits', 'F6V.hd16673.fits', \
+                'F7V.hd16895.fits', 'G2V.hd28099.fits', 'F1V.hd40136.fits', \
+                'F0V.hd58946.fits', 'A1V.hd65900.fits', 'F9V.hd70110.fits', \
+                'G3V.hd78558.fits', 'F4V.hd87822.fits', 'F3V.hd91752.fits', \
+                'G6V.hd111721.fits', 'A2V.hd116656.fits',  \
+                'A0V.hd130109.fits', 'A4V.hd136729.fits', 'B9V.hd149630.fits', \
+                'A3V.hd151431.fits', 'A7V.hd153653.fits', 'B1V.hd154445.fits', \
+                'A8V.hd158352.fits', \
+                'B5V.hd173087.fits', 'B6V.hd173936.fits', 'B7V.hd177817.fits', \
+                'A6V.hd186307.fits', \
+                'B4V.hd189944.fits', 'B3V.hd190993.fits', 'O9V.hd193322.fits', \
+                'B8V.hd207516.fits', 'B2V.hd212978.fits']
+
+# spectral standards
+stdfilelist = ['O9V.hd149757.fits', 'B2V.hd193536.fits', 'B5V.hd158148.fits', \
+            'B8V.hd172958.fits', 'A0V.hd103287.fits', 'A3V.hd106591.fits', \
+            'A6V.hd186307.fits', 'A8V.hd155514.fits', 'F2V.hd33256.fits', \
+            'F5V.hd11592.fits', 'F8V.hd11007.fits', 'G1V.hd89707.fits', \
+            'G4V.hd32923.fits', 'G8V.hd10700.fits']
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cluster data for the HR Diagram simulation, read from stardata.xlsx only once.
+
+Parsing every sheet of the spreadsheet takes most of the simulation's startup
+time.  A ClusterCatalog converts each sheet to a .npz file of typed columns
+(numbers as float or int arrays, text as string arrays) in a cache directory
+next to the spreadsheet, and afterwards loads a cluster's file only when that
+cluster is selected.  The cache is rebuilt automatically whenever the
+spreadsheet is newer than it, so sheets can still be added or edited in Excel.
+If the spreadsheet's folder cannot be written, the cache goes in a per-user
+directory instead, and if that fails too the sheets are simply kept in memory.
+
+The catalog behaves like the dictionary of DataFrames returned by
+pd.read_excel(..., sheet_name=None).  The cache can also be built ahead of
+time, e.g.
+    python cluster_catalog.py stardata.xlsx
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+
+
+usercachedir = os.path.join(os.path.expanduser('~'), '.introastrosim', 'clusters')
+
+
+# column of a sheet as a typed array: numbers where the column is numeric,
+# otherwise text, with empty cells as ''
+def column_array(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy()
+    numbers = pd.to_numeric(column, errors='coerce')
+    if numbers.notna().sum() == column.notna().sum():
+        return numbers.to_numpy(dtype=float)
+    return column.fillna('').astype(str).to_numpy(dtype=str)
+
+
+# every sheet of a spreadsheet as a dictionary of typed columns
+def read_sheets(xlsx):
+    sheets = pd.read_excel(xlsx, sheet_name=None)
+    return {name: {str(col): column_array(df[col]) for col in df.columns} \
+            for name, df in sheets.items()}
+
+
+class ClusterCatalog(Mapping):
+    def __init__(self, xlsx, cachedir=None):
+        self.xlsx = xlsx
+        if cachedir is None:   # next to the spreadsheet, or else in the user's cache
+            xlsxpath = os.path.abspath(xlsx)
+            name = os.path.splitext(os.path.basename(xlsxpath))[0] + '_' + \
+                hashlib.sha256(xlsxpath.encode('utf-8')).hexdigest()[:12]
+            cachedirs = [os.path.splitext(xlsx)[0] + '_cache', os.path.join(usercachedir, name)]
+        else:
+            cachedirs = [cachedir]
+        self.tables = {}
+        self.files = None
+
+        for cachedir in cachedirs:
+            self.cachedir = cachedir
+            self.indexfile = os.path.join(cachedir, 'index.json')
+            try:
+                if self.stale():
+                    self.build()
+                with open(self.indexfile) as f:
+                    self.files = json.load(f)    # sheet name -> npz file, in sheet order
+                break
+            except OSError:    # e.g. no write access; try the next place
+                pass
+
+        if self.files is None:    # no cache could be written: keep the sheets in memory
+            if len(self.tables) == 0:
+                self.tables = {name: pd.DataFrame(columns) \
+                               for name, columns in read_sheets(xlsx).items()}
+            self.files = dict.fromkeys(self.tables)
+
+    # True if the cache is missing or older than the spreadsheet
+    def stale(self):
+        if not os.path.exists(self.indexfile):
+            return True
+        return os.path.getmtime(self.xlsx) > os.path.getmtime(self.indexfile)
+
+    # parse every sheet once and save each as a .npz file.  The parsed sheets
+    # are also kept, so they can still be used if the cache cannot be written.
+    def build(self):
+        sheets = read_sheets(self.xlsx)
+        self.tables = {name: pd.DataFrame(columns) for name, columns in sheets.items()}
+        os.makedirs(self.cachedir, exist_ok=True)
+        files = {}
+        for i, (name, columns) in enumerate(sheets.items()):
+            files[name] = 'sheet%02d.npz' % i
+            np.savez(os.path.join(self.cachedir, files[name]), **columns)
+        # the index is written last, so an interrupted build is redone next time
+        with open(self.indexfile, 'w') as f:
+            json.dump(files, f, indent=1)
+
+    def __getitem__(self, name):
+        if name not in self.tables:
+            with np.load(os.path.join(self.cachedir, self.files[name])) as data:
+                self.tables[name] = pd.DataFrame({col: data[col] for col in data.files})
+        return self.tables[name]
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description= \
+        "Convert the sheets of the HR Diagram spreadsheet to the simulation's cluster cache.")
+    parser.add_argument('xlsx', nargs='?', default='stardata.xlsx', help="spreadsheet of cluster data")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the cache even if it is up to date")
+    args = parser.parse_args()
+
+    tstart = time.perf_counter()
+    catalog = ClusterCatalog(args.xlsx)
+    if args.rebuild:
+        catalog.build()
+    for name in catalog:
+        print('%-22s %4d stars' % (name, len(catalog[name])))
+    print('Loaded in %.3f s' % (time.perf_counter() - tstart))
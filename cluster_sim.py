@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic star cluster datasets for the HR Diagram simulation.
+
+The simulated clusters in stardata.xlsx hold absolute magnitudes from the
+PARSEC isochrones.  To make each dataset unique, random positions on the sky,
+a random distance modulus and photometric noise that grows with magnitude are
+added.  HR_diagram_v2.py uses the same functions for one cluster at a time;
+simulate_clusters() makes any number of realizations at once as arrays.
+
+Running this file writes datasets for students and an answer key of the
+distance moduli, e.g. 500 datasets of each simulated cluster:
+    python cluster_sim.py stardata.xlsx datasets/ --count 500 --seed 2024
+Each dataset is a csv file with the same columns as the spreadsheet (Star ID,
+X, Y, B mag, V mag, R mag), so it can be pasted into stardata.xlsx as a new
+sheet.
+"""
+
+import numpy as np
+
+
+framewidth = 600     # size of the sky canvas in HR_diagram_v2.py (pixels)
+frameheight = 600
+
+
+
+# random positions of N stars (or an array of shape size), concentrated
+# toward the middle of the sky canvas
+def random_positions(rng, size, width=framewidth, height=frameheight):
+    r = rng.normal(0, height/4, size)
+    theta = rng.uniform(0, 2*np.pi, size)
+    return r*np.cos(theta) + width/2, r*np.sin(theta) + height/2
+
+
+# random distance modulus, one per cluster
+def random_distmod(rng, size=None, low=0.5, high=10):
+    return rng.uniform(low, high, size)
+
+
+# magnitudes plus uniform noise whose amplitude grows logarithmically from the
+# brightest star of each cluster (the last axis of mag)
+def add_noise(rng, mag):
+    mag = np.asarray(mag, dtype=float)
+    amplitude = np.log(1 + (mag - np.nanmin(mag, axis=-1, keepdims=True))*.03)
+    return mag + rng.uniform(-amplitude, amplitude)
+
+
+# count realizations of a cluster with absolute magnitudes B, V, R.  Returns a
+# dictionary of arrays: x, y, B, V, R with shape (count, N) and distmod with
+# shape (count,).
+def simulate_clusters(B, V, R, count, seed=None, width=framewidth, height=frameheight):
+    rng = np.random.default_rng(seed)
+    N = len(V)
+    x, y = random_positions(rng, (count, N), width, height)
+    distmod = random_distmod(rng, count)
+    shift = distmod[:, np.newaxis]
+    return {'x': x, 'y': y, \
+            'B': add_noise(rng, np.asarray(B, dtype=float) + shift), \
+            'V': add_noise(rng, np.asarray(V, dtype=float) + shift), \
+            'R': add_noise(rng, np.asarray(R, dtype=float) + shift), \
+            'distmod': distmod}
+
+
+# make len(filenames) realizations of a cluster from seed and write them to
+# csv files; returns their distance moduli.  Runs in a worker process, so only
+# the cluster's magnitudes and a seed are sent to it.
+def write_datasets(B, V, R, seed, filenames, decimals=2):
+    import pandas as pd
+    sim = simulate_clusters(B, V, R, len(filenames), seed)
+    N = len(V)
+    for i, filename in enumerate(filenames):
+        df = pd.DataFrame({'Star ID': np.arange(N), \
+                           'X': sim['x'][i], 'Y': sim['y'][i], \
+                           'B mag': sim['B'][i], 'V mag': sim['V'][i], 'R mag': sim['R'][i]})
+        df.round(decimals).to_csv(filename, index=False)
+    return sim['distmod']
+
+
+
+if __name__ == '__main__':
+    import os
+    import argparse
+    import time
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    from cluster_catalog import ClusterCatalog
+
+    parser = argparse.ArgumentParser(description= \
+        "Write random realizations of the simulated clusters for the HR Diagram lab, with an answer key.")
+    parser.add_argument('xlsx', help="spreadsheet of cluster data, e.g. stardata.xlsx")
+    parser.add_argument('outdir', help="directory for the datasets and answers.csv")
+    parser.add_argument('--cluster', action='append', \
+                        help="cluster (sheet) to use; may be repeated (default: all simulated clusters)")
+    parser.add_argument('--count', type=int, default=30, help="datasets per cluster (default 30)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed, to make the same datasets again")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    tstart = time.perf_counter()
+    catalog = ClusterCatalog(args.xlsx)
+    clusters = args.cluster
+    if clusters is None:   # sheets without positions are simulated clusters, as in the simulation
+        clusters = [name for name in catalog if 'X' not in catalog[name] and \
+                    'RA (J2000)' not in catalog[name]]
+    os.makedirs(args.outdir, exist_ok=True)
+
+    # each chunk of datasets is made and written by a worker from its own seed,
+    # so memory use does not grow with --count
+    seeds = np.random.SeedSequence(args.seed).spawn(len(clusters))
+    chunksize = max(1, min(args.count // 16, 100))
+    jobs = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for name, seed in zip(clusters, seeds):
+            df = catalog[name]
+            B, V, R = [df[col].to_numpy(dtype=float) for col in ('B mag', 'V mag', 'R mag')]
+            stem = name.replace(' ', '_')
+            filenames = [os.path.join(args.outdir, '%s_%04d.csv' % (stem, i+1)) \
+                         for i in range(args.count)]
+            chunks = [filenames[first:first+chunksize] for first in range(0, args.count, chunksize)]
+            for chunk, chunkseed in zip(chunks, seed.spawn(len(chunks))):
+                jobs.append((name, chunk, pool.submit(write_datasets, B, V, R, chunkseed, chunk)))
+
+        answers = []
+        for name, chunk, future in jobs:
+            for filename, distmod in zip(chunk, future.result()):
+                answers.append((os.path.basename(filename), name, distmod))
+
+    answers = pd.DataFrame(answers, columns=['File', 'Cluster', 'Distance modulus'])
+    answers.round(3).to_csv(os.path.join(args.outdir, 'answers.csv'), index=False)
+    print('Wrote %d datasets to %s in %.1f s' % (len(answers), args.outdir, time.perf_counter() - tstart))
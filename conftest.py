@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared pytest fixtures: a local web server serving a temporary directory, in
+place of the data archives the simulations download from.
+"""
+
+import os
+import time
+import threading
+import functools
+import http.server
+import pytest
+
+
+
+# yields the server's root url, the directory it serves (with three small
+# files a.jpg, b.jpg and c.jpg) and a list of the paths requested so far
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / 'served'
+    served.mkdir()
+    for name in ['a.jpg', 'b.jpg', 'c.jpg']:
+        (served / name).write_bytes(os.urandom(1000))
+
+    requests = []
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            requests.append(self.path)
+
+        # slow.jpg trickles out for 10 s, for stopping downloads part way
+        def do_GET(self):
+            if self.path != '/slow.jpg':
+                return super().do_GET()
+            self.send_response(200)
+            self.send_header('Content-Length', str(100*1000))
+            self.end_headers()
+            try:
+                for i in range(100):
+                    self.wfile.write(os.urandom(1000))
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except OSError:    # the client hung up
+                pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), \
+        functools.partial(Handler, directory=str(served)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/' % httpd.server_address[1], served, requests
+    httpd.shutdown()
+    httpd.server_close()
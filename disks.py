@@ -21,7 +21,8 @@ import datetime as dt
 import numpy as np 
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from astropy.io import fits
+from scheduler import UpdateScheduler
+from fits_cache import ImageCache
 
 
 
@@ -38,61 +39,97 @@ def set_colormap(option):
 def set_rad(value):
 	global rad	
 	rad = slider_rad.get()
-	plot_disk()
+	redraw_tool.request()
 	
 def set_xoff(value):
 	global xoff	
 	xoff = slider_xoff.get()
-	plot_disk()
+	redraw_tool.request()
 	
 def set_yoff(value):
 	global yoff	
 	yoff = slider_yoff.get()
-	plot_disk()
+	redraw_tool.request()
 
 def set_inc(value):
 	global inc	
 	inc = slider_inc.get()
-	plot_disk()
+	redraw_tool.request()
     
 def set_pos_angle(value):
 	global pos_angle
 	pos_angle = slider_pos_angle.get()
-	plot_disk()
+	redraw_tool.request()
 
 def set_zoom(value):
 	global zoom
 	zoom = slider_zoom.get()
-	plot_disk()	
+	redraw.request()	
 
 
-def plot_disk():
-	global star, zoom, rad, pos_angle, xoff, yoff
-		
+# build the image figure once; plot_disk and plot_tool only update its artists
+def setup_disk():
+	global diskplot, diskaxes, diskimage, toolline, diskbackground
 
-	# retrieve the image data
-	dir = "/Users/gmcswain/Documents/Lehigh/Teaching/ASTR008/GUIs/Disks/"
-	#dir = ""
-	image_file = dir + star + '_continuum.fits'
-	image_data, header = fits.getdata(image_file, header=True) 
-	nx = header['NAXIS1']
-	ny = header['NAXIS2']
-	startx = np.int16(nx * 0.1*zoom/2)
-	endx = np.int16(nx * (1 - 0.1*zoom/2))
-	starty = np.int16(ny * 0.1*zoom/2)
-	endy = np.int16(ny * (1 - 0.1*zoom/2))
-	rows = image_data.shape[2]
-	cols = image_data.shape[3]
-	im = image_data.reshape(rows, cols) 
 	f = Figure(figsize=(8,8), dpi=100)
 	#f.subplots_adjust(left=0.05, bottom=0.05, right=0.95, top=0.95)  # sets boundary around image
 	f.subplots_adjust(left=0, bottom=0, right=1, top=1)  # no boundary
 	a = f.add_subplot(111)
-	a.imshow(im[startx:endx, starty:endy], cmap='hot')
+	diskimage = a.imshow(np.zeros((2, 2)), cmap='hot')
 	a.axis('off')
 
-	pixscale = header['CDELT2'] * 3600 * 1000   # units of milliarcsec
+	# the measuring tool is blitted over a saved copy of the image layer
+	toolline, = a.plot([], [], 'w-', linewidth=1, animated=True)
+	diskaxes = a
+
+	diskplot = FigureCanvasTkAgg(f, master=imageframe)
+	diskplot.get_tk_widget().place(relx=0, rely=0)
+	diskplot.mpl_connect('draw_event', save_disk_background)
+	diskbackground = None
+
+
+# after every full redraw, save the image layer and draw the tool on top
+def save_disk_background(event):
+	global diskbackground
+	diskbackground = diskplot.copy_from_bbox(diskplot.figure.bbox)
+	diskaxes.draw_artist(toolline)
+
+
+# redraw the image layer; only needed when the star or zoom changes
+def plot_disk():
+	global star, zoom, imshape
+		
+
+	# retrieve the image data; each star is read from disk only once
+	img = images.get(star)
+	im = img.crop(zoom)
+	imshape = im.shape
+	diskimage.set_data(im)
+	diskimage.autoscale()   # rescale colors to the visible part of the image
+	diskimage.set_extent((-0.5, im.shape[1]-0.5, im.shape[0]-0.5, -0.5))
+	diskaxes.set_xlim(-0.5, im.shape[1]-0.5)
+	diskaxes.set_ylim(im.shape[0]-0.5, -0.5)
+
+	pixscale = img.pixscale()   # units of milliarcsec
 	#print (pixscale)
+
+	update_tool()
+	diskplot.draw()
+
+
+# redraw only the measuring tool over the saved image layer
+def plot_tool():
+	if diskbackground is None:
+		plot_disk()
+		return
+	update_tool()
+	diskplot.restore_region(diskbackground)
+	diskaxes.draw_artist(toolline)
+	diskplot.blit(diskplot.figure.bbox)
+
+
+def update_tool():
+	global rad, pos_angle, xoff, yoff, inc, imshape
 	
 	# draw circle to measure disk, including inclination and position angle
 	theta = np.arange(0, 2*np.pi, 2*np.pi/1000)
@@ -102,8 +139,8 @@ def plot_disk():
 	ydisk_new = -xdisk * np.sin(pos_angle*np.pi/180) + ydisk * np.cos(pos_angle*np.pi/180)
 	xdisk = xdisk_new
 	ydisk = ydisk_new
-	xcent = (endx - startx)/2 
-	ycent = (endy - starty)/2
+	xcent = imshape[0]/2 
+	ycent = imshape[1]/2
 	xtool = xdisk + xcent + xoff
 	ytool = ydisk + ycent - yoff
 	
@@ -117,12 +154,8 @@ def plot_disk():
 	tmp = np.where(ytool < 2*ycent-1, ytool, 2*ycent-1)
 	ytool = tmp
 	
-	if showtool.get() == 1:
-		a.plot(xtool, ytool, 'w-', linewidth=1)
-
-	plot = FigureCanvasTkAgg(f, master=imageframe)
-	plot.draw()
-	plot.get_tk_widget().place(relx=0, rely=0)
+	toolline.set_data(xtool, ytool)
+	toolline.set_visible(showtool.get() == 1)
 
 
     
@@ -136,6 +169,15 @@ frameheight = 800
 framewidth = int(frameheight*1.5)
 window.geometry(str(framewidth)+'x'+str(frameheight))
 
+# merge bursts of slider events into one redraw per frame
+redraw = UpdateScheduler(window, plot_disk)
+redraw_tool = UpdateScheduler(window, plot_tool)
+
+# keep the most recently viewed disk images in memory
+dir = "/Users/gmcswain/Documents/Lehigh/Teaching/ASTR008/GUIs/Disks/"
+#dir = ""
+images = ImageCache(dir, maxsize=4)
+
 
 # frame to display menu options
 menuframe = tk.Frame(window, width=framewidth/3, height=frameheight)
@@ -188,7 +230,7 @@ showtool.set(0)
 showtoolbox = tk.Checkbutton(menuframe, text="Show Measuring Tool", \
 							 font=("Ariel", 14), \
 							 variable=showtool, onvalue=1, offvalue=0, \
-							 command=plot_disk)
+							 command=plot_tool)
 showtoolbox.place(relx = 0.1, rely = row_pos+0)
 
 label_scale = tk.Label(menuframe, text="Image Scale: 1 pixel = 3 milliarcsec", \
@@ -280,6 +322,7 @@ infolabel3.place(relx = 0.1, rely=row_pos+.06)
 
 
 
+setup_disk()
 plot_disk()
 
 
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-memory cache of FITS images for the Protoplanetary Disks simulation.
+
+Each image is read once with memory mapping, squeezed to a 2-D array, and the
+crop for every zoom level is stored as a slice view of that array, so changing
+the zoom never copies or re-reads the data.  Only the most recently used images
+are kept open; older ones are dropped when the cache is full.
+"""
+
+from collections import OrderedDict
+import numpy as np
+from astropy.io import fits
+
+
+
+# one cached image with its header and a slice view for each zoom level
+class CachedImage:
+    def __init__(self, image_file, nzoom=10):
+        image_data, header = fits.getdata(image_file, header=True, memmap=True)
+        self.header = header
+        self.image = np.squeeze(image_data)   # drop the Stokes and frequency axes
+        nx = header['NAXIS1']
+        ny = header['NAXIS2']
+        self.crops = []
+        for zoom in range(nzoom):
+            startx = np.int16(nx * 0.1*zoom/2)
+            endx = np.int16(nx * (1 - 0.1*zoom/2))
+            starty = np.int16(ny * 0.1*zoom/2)
+            endy = np.int16(ny * (1 - 0.1*zoom/2))
+            self.crops.append(self.image[startx:endx, starty:endy])
+
+    def crop(self, zoom):
+        return self.crops[zoom]
+
+    def pixscale(self):
+        return self.header['CDELT2'] * 3600 * 1000   # units of milliarcsec
+
+
+# least-recently-used cache of CachedImage objects, keyed by star name
+class ImageCache:
+    def __init__(self, directory, maxsize=4, suffix='_continuum.fits'):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.suffix = suffix
+        self.images = OrderedDict()
+
+    def get(self, star):
+        if star in self.images:
+            self.images.move_to_end(star)
+        else:
+            self.images[star] = CachedImage(self.directory + star + self.suffix)
+            while len(self.images) > self.maxsize:
+                self.images.popitem(last=False)
+        return self.images[star]
+
+    def __contains__(self, star):
+        return star in self.images
+
+    def __len__(self):
+        return len(self.images)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Isochrone fitting for the HR Diagram simulation datasets.
+
+A cluster's stars are compared with one or more isochrones (tables of
+absolute B, V, R magnitudes, such as the PARSEC samples in stardata.xlsx)
+shifted by a grid of distance moduli and, optionally, reddenings.  For every
+shift, the distance from each star to the nearest isochrone point in the
+color-magnitude diagram is found with a KD-tree, for all stars and all
+distance moduli in one query.  The shift with the smallest sum of squared
+distances is the best fit; distances are capped so that field stars and
+outliers cannot dominate.  The uncertainty of the distance modulus is where
+this sum rises by one (in units of the scatter of the stars about the best
+fit).
+
+Running this file checks the fit against random datasets of the simulated
+clusters (see cluster_sim.py), or against a directory of datasets written by
+cluster_sim.py and its answers.csv, e.g.
+    python isochrone_fit.py stardata.xlsx --count 20
+    python isochrone_fit.py stardata.xlsx --datasets datasets/
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+RV = 3.1      # A_V / E(B-V)
+EVR = 0.78    # E(V-R) / E(B-V)
+
+
+
+# points of a color-magnitude diagram: B-V, V-R (if R is given) and V
+def cmd_points(B, V, R=None):
+    B = np.asarray(B, dtype=float)
+    V = np.asarray(V, dtype=float)
+    columns = [B - V]
+    if R is not None:
+        columns.append(V - np.asarray(R, dtype=float))
+    columns.append(V)
+    return np.stack(columns, axis=-1)
+
+
+# shift of a color-magnitude diagram point caused by reddening E(B-V)
+def reddening_vector(ebv, ndim):
+    if ndim == 2:
+        return np.array([ebv, RV*ebv])
+    return np.array([ebv, EVR*ebv, RV*ebv])
+
+
+# sum over stars of the squared distance (at most clip**2) to the nearest point
+# of the isochrone, for every distance modulus in distmods
+def fit_scores(tree, points, distmods, clip=0.5):
+    shifted = np.repeat(points[np.newaxis, :, :], len(distmods), axis=0)
+    shifted[:, :, -1] -= np.asarray(distmods)[:, np.newaxis]
+    dist, index = tree.query(shifted.reshape(-1, points.shape[1]), \
+                             distance_upper_bound=clip)
+    dist = np.minimum(dist, clip).reshape(len(distmods), len(points))
+    return np.sum(dist**2, axis=1)
+
+
+# fit the distance modulus (and optionally the reddening and isochrone) of a
+# cluster with apparent magnitudes B, V and optionally R.  isochrones maps
+# names (e.g. ages) to (B, V, R) tables of absolute magnitudes.  Returns a
+# dictionary with the best isochrone, distmod, its uncertainty, reddening,
+# and the scores on the whole grid (isochrones x reddenings x distmods).
+def fit_cluster(B, V, R, isochrones, distmods=None, reddenings=(0,), clip=0.5):
+    if distmods is None:
+        distmods = np.arange(0, 15.005, 0.01)
+    distmods = np.asarray(distmods, dtype=float)
+    points = cmd_points(B, V, R)
+    points = points[np.all(np.isfinite(points), axis=1)]
+
+    names = list(isochrones)
+    scores = np.zeros((len(names), len(reddenings), len(distmods)))
+    for i, name in enumerate(names):
+        isoB, isoV, isoR = isochrones[name]
+        iso = cmd_points(isoB, isoV, isoR if R is not None else None)
+        tree = cKDTree(iso[np.all(np.isfinite(iso), axis=1)])
+        for j, ebv in enumerate(reddenings):
+            dereddened = points - reddening_vector(ebv, points.shape[1])
+            scores[i, j] = fit_scores(tree, dereddened, distmods, clip)
+
+    i, j, k = np.unravel_index(np.argmin(scores), scores.shape)
+    best = scores[i, j]
+
+    # 1-sigma range: where the score rises by the mean squared scatter per star
+    scatter = max(best[k] / max(len(points) - 1, 1), 1e-6)
+    within = distmods[best <= best[k] + scatter]
+    step = distmods[1] - distmods[0] if len(distmods) > 1 else 0
+    sigma = max((within.max() - within.min())/2, step/2)
+
+    return {'isochrone': names[i], 'distmod': distmods[k], 'sigma': sigma, \
+            'reddening': reddenings[j], 'scores': scores}
+
+
+
+if __name__ == '__main__':
+    import os
+    import argparse
+    import time
+    import pandas as pd
+    from cluster_catalog import ClusterCatalog
+    from cluster_sim import simulate_clusters
+
+    parser = argparse.ArgumentParser(description= \
+        "Recover the distance moduli of simulated HR Diagram datasets by isochrone fitting.")
+    parser.add_argument('xlsx', help="spreadsheet of cluster data, e.g. stardata.xlsx")
+    parser.add_argument('--datasets', default=None, \
+                        help="directory written by cluster_sim.py, checked against its answers.csv")
+    parser.add_argument('--count', type=int, default=20, \
+                        help="random datasets per simulated cluster, if --datasets is not given")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for the datasets")
+    args = parser.parse_args()
+
+    catalog = ClusterCatalog(args.xlsx)
+    simulated = [name for name in catalog if 'X' not in catalog[name] and \
+                 'RA (J2000)' not in catalog[name]]
+    isochrones = {name: (catalog[name]['B mag'], catalog[name]['V mag'], catalog[name]['R mag']) \
+                  for name in simulated}
+
+    # (cluster, true distance modulus, B, V, R) for every dataset
+    tests = []
+    if args.datasets is not None:
+        answers = pd.read_csv(os.path.join(args.datasets, 'answers.csv'))
+        for filename, name, distmod in answers.itertuples(index=False):
+            df = pd.read_csv(os.path.join(args.datasets, filename))
+            tests.append((name, distmod, df['B mag'], df['V mag'], df['R mag']))
+    else:
+        seeds = np.random.SeedSequence(args.seed).spawn(len(simulated))
+        for name, seed in zip(simulated, seeds):
+            sim = simulate_clusters(*isochrones[name], args.count, seed)
+            for i in range(args.count):
+                tests.append((name, sim['distmod'][i], sim['B'][i], sim['V'][i], sim['R'][i]))
+
+    tstart = time.perf_counter()
+    errors = []
+    pulls = []
+    for name, distmod, B, V, R in tests:
+        fit = fit_cluster(B, V, R, {name: isochrones[name]})
+        errors.append(fit['distmod'] - distmod)
+        pulls.append(errors[-1] / fit['sigma'])
+    elapsed = time.perf_counter() - tstart
+
+    errors = np.array(errors)
+    pulls = np.array(pulls)
+    print('%d datasets: rms error %.3f mag, largest %.3f mag' % \
+          (len(errors), np.sqrt(np.mean(errors**2)), np.abs(errors).max()))
+    print('%.0f%% within 1 sigma, %.0f%% within 0.1 mag' % \
+          (100*np.mean(np.abs(pulls) <= 1), 100*np.mean(np.abs(errors) <= 0.1)))
+    print('%.3f s per cluster' % (elapsed / len(tests)))
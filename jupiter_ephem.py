@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ephemeris tables for the Moons of Jupiter simulation.
+
+Instead of asking Skyfield for each moon at each time step, an EphemerisTable
+evaluates all four Galilean moons over a whole grid of times (for example, 30
+nights at a 2 hour cadence) with one array-valued Time.  Stepping forward or
+back in the simulation then becomes a table lookup.  Positions are ecliptic
+coordinates relative to Jupiter, in units of Jupiter's diameter, as used by
+updatemoons() in moons_jupiter_v3.py.
+
+Like the simulation, this requires NASA's ephemeris file 'jup365.bsp' from
+https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/satellites/.
+"""
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+from skyfield.api import load_file
+
+
+moonnames = ['IO', 'EUROPA', 'GANYMEDE', 'CALLISTO']
+jupdiam = 139822.   # km
+
+
+
+# load Jupiter and its moons from the ephemeris file.  The file is memory
+# mapped by jplephem, and only the segments for these five bodies are read,
+# the first time a position is computed.
+def load_bodies(filename):
+    kernel = load_file(filename)
+    bodies = {'JUPITER BARYCENTER': kernel['JUPITER BARYCENTER']}
+    for name in moonnames:
+        bodies[name] = kernel[name]
+    return bodies
+
+
+# moon positions at times start, start+deltat, ..., for count steps of deltat hours
+class EphemerisTable:
+    def __init__(self, bodies, ts, start, deltat, count):
+        self.start = start
+        self.deltat = deltat
+        self.times = [start + dt.timedelta(hours=deltat*k) for k in range(count)]
+        self.index = dict(zip(self.times, range(count)))
+
+        # one array-valued Time covers the whole grid
+        t0 = start.astimezone(dt.timezone.utc)
+        hours = deltat * np.arange(count)
+        self.tsky = ts.utc(t0.year, t0.month, t0.day, t0.hour, t0.minute, \
+                           t0.second + t0.microsecond/1e6 + hours*3600)
+
+        # x, y, z for each moon, each with shape (3, count)
+        jupiter_at = bodies['JUPITER BARYCENTER'].at(self.tsky)
+        self.positions = {}
+        for name in moonnames:
+            self.positions[name] = \
+                jupiter_at.observe(bodies[name]).ecliptic_position().km / jupdiam
+
+    def __contains__(self, time):
+        return time in self.index
+
+    def __len__(self):
+        return len(self.times)
+
+    # x, y, z of one moon at a time on the table's grid
+    def position(self, name, time):
+        return self.positions[name][:, self.index[time]]
+
+    # all positions as a table, e.g. for an instructor's answer key
+    def to_dataframe(self):
+        utc = [t.astimezone(dt.timezone.utc) for t in self.times]
+        jd = np.array([t.timestamp() for t in self.times]) / 86400 + 2440587.5
+        df = pd.DataFrame({'UTC': utc, 'JD': jd})
+        for name in moonnames:
+            x, y, z = self.positions[name]
+            df[name.capitalize() + ' x'] = x
+            df[name.capitalize() + ' y'] = y
+            df[name.capitalize() + ' z'] = z
+        return df
+
+    def to_csv(self, filename):
+        self.to_dataframe().to_csv(filename, index=False)
+
+
+# table of ndays days centered on time t, at a cadence of deltat hours
+def build_table(bodies, ts, t, deltat, ndays=30):
+    nhalf = int(ndays*24 / (2*deltat))
+    start = t - dt.timedelta(hours=deltat*nhalf)
+    return EphemerisTable(bodies, ts, start, deltat, 2*nhalf + 1)
+
+
+# x-positions only (the values shown when clicking a moon), for answer keys
+def moon_xpositions(table, decimals=None):
+    df = table.to_dataframe()
+    df = df[['UTC', 'JD'] + [name.capitalize() + ' x' for name in moonnames]]
+    df.columns = ['UTC', 'JD'] + [name.capitalize() for name in moonnames]
+    if decimals is not None:
+        df = df.round({name.capitalize(): decimals for name in moonnames})
+    return df
+
+
+# compute count positions from start, in chunks, and write them to a csv or parquet file
+def write_positions(bodies, ts, start, deltat, count, filename, \
+                    chunksize=5000, decimals=2):
+    parquet = filename.endswith('.parquet')
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+
+    for first in range(0, count, chunksize):
+        t = start + dt.timedelta(hours=deltat*first)
+        table = EphemerisTable(bodies, ts, t, deltat, min(chunksize, count - first))
+        df = moon_xpositions(table, decimals)
+        if parquet:
+            batch = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(filename, batch.schema)
+            writer.write_table(batch)
+        else:
+            df.to_csv(filename, mode='w' if first == 0 else 'a', \
+                      header=(first == 0), index=False)
+
+    if parquet and writer is not None:
+        writer.close()
+
+
+
+if __name__ == '__main__':
+    import argparse
+    from skyfield.api import load
+
+    parser = argparse.ArgumentParser(description= \
+        "Write the x-positions of Jupiter's moons (in Jupiter diameters) to a csv or parquet file.")
+    parser.add_argument('start', help="first time in UTC, e.g. '2024-01-15' or '2024-01-15 06:00'")
+    parser.add_argument('output', help="output file, ending in .csv or .parquet")
+    parser.add_argument('--deltat', type=float, default=2, help="hours between positions (default 2)")
+    parser.add_argument('--count', type=int, default=360, help="number of positions (default 360)")
+    parser.add_argument('--ephemeris', default='./jup365.bsp', help="path to jup365.bsp")
+    parser.add_argument('--decimals', type=int, default=2, \
+                        help="round positions to this many decimals (default 2, as in the simulation)")
+    args = parser.parse_args()
+
+    start = dt.datetime.fromisoformat(args.start).replace(tzinfo=dt.timezone.utc)
+    bodies = load_bodies(args.ephemeris)
+    ts = load.timescale(builtin=True)
+    write_positions(bodies, ts, start, args.deltat, args.count, args.output, \
+                    decimals=args.decimals)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Solver for Kepler's equation, M = E - e*sin(E), shared by the binary star
+simulations.
+
+The solver works on the whole array of mean anomalies at once using Newton's
+method.  The starting guess E0 = M + 0.85*e*sign(sin M) (Danby 1988) converges
+for every eccentricity below 1, which covers the 0-0.9 range of the
+eccentricity slider in spectroscopic_binary_gui.py.
+
+Run this file directly to compare the speed of the vectorized solver with the
+original fixed-point loop:
+    python kepler.py
+"""
+
+import timeit
+import numpy as np
+
+
+
+# solve M = E - e*sin(E) for E, over an array of mean anomalies M
+def solve_kepler(M, ecc, tol=1e-10, maxiter=50):
+    M = np.asarray(M, dtype=float)
+    E = M + 0.85*ecc*np.sign(np.sin(M))
+    for i in range(maxiter):
+        dE = (E - ecc*np.sin(E) - M) / (1 - ecc*np.cos(E))
+        E = E - dE
+        if np.max(np.abs(dE), initial=0) < tol:   # all points have converged
+            break
+    return E
+
+
+# eccentric anomaly at times t (same units as period)
+def kepler_eqn(t, period, ecc):
+    M = 2*np.pi*np.asarray(t, dtype=float) / period
+    return solve_kepler(M, ecc)
+
+
+# original version from spectroscopic_binary_gui.py, kept for benchmarking
+def kepler_eqn_loop(t, period, ecc):
+    E = np.zeros(len(t))
+    for i in range(len(t)):
+        Etmp = 0
+        for j in range(100):  # number of iterations to solve nonlinear eqn
+            Etmp = 2*np.pi*t[i] / period + ecc*np.sin(Etmp)
+        E[i] = Etmp
+    return E
+
+
+
+if __name__ == '__main__':
+    period = 5
+    Ntimes = 1000
+    t = np.linspace(0, period, Ntimes, endpoint=False)
+
+    print('  ecc    loop (ms)   vectorized (ms)   speedup   max |E diff|')
+    for ecc in [0, 0.3, 0.6, 0.9]:
+        nloop = 3
+        nvec = 200
+        tloop = timeit.timeit(lambda: kepler_eqn_loop(t, period, ecc), number=nloop) / nloop
+        tvec = timeit.timeit(lambda: kepler_eqn(t, period, ecc), number=nvec) / nvec
+        diff = np.max(np.abs(kepler_eqn_loop(t, period, ecc) - kepler_eqn(t, period, ecc)))
+        print('% 5.2f  % 10.2f  % 16.4f  % 8.0fx  % 13.2e' % \
+              (ecc, tloop*1000, tvec*1000, tloop/tvec, diff))
@@ -25,11 +25,16 @@ https://rhodesmill.org/skyfield/planets.html .
 
 """
 
+import time
+tstart = time.perf_counter()   # for reporting the startup time
+
 import tkinter as tk
 import datetime as dt
 from astropy.time import Time, TimezoneInfo
 import astropy.units as u
-from skyfield.api import load, load_file
+from skyfield.api import load
+from jupiter_ephem import load_bodies, build_table
+from canvas_table import CanvasTable
 
 
 
@@ -131,34 +136,40 @@ def settzone():
     
 
 def updatemoons():
-    global ttemp, io_ball, eu_ball, ga_ball, ca_ball, framewidth, frameheight
+    global ttemp, io_ball, eu_ball, ga_ball, ca_ball, ju_ball, framewidth, frameheight
     sky.bind("<Button-1>", mooncoords)
-    tmoon = ts.utc(ttemp)
-    jupdiam = 139822.
+    ephem = get_ephemeris()
     ju_x, ju_z = [framewidth/2, frameheight/8]
-    #io_x, io_y, io_z = jupiter.at(tmoon).observe(io).position.km / jupdiam
-    io_x, io_y, io_z = jupiter.at(tmoon).observe(io).ecliptic_position().km / jupdiam
-    eu_x, eu_y, eu_z = jupiter.at(tmoon).observe(europa).ecliptic_position().km / jupdiam
-    ga_x, ga_y, ga_z = jupiter.at(tmoon).observe(ganymede).ecliptic_position().km / jupdiam
-    ca_x, ca_y, ca_z = jupiter.at(tmoon).observe(callisto).ecliptic_position().km / jupdiam
+    io_x, io_y, io_z = ephem.position('IO', ttemp)
+    eu_x, eu_y, eu_z = ephem.position('EUROPA', ttemp)
+    ga_x, ga_y, ga_z = ephem.position('GANYMEDE', ttemp)
+    ca_x, ca_y, ca_z = ephem.position('CALLISTO', ttemp)
     moonrad = 3
     juprad = 13
     xscale = juprad*2
     zscale = xscale
     io_ball = sky.create_oval(ju_x + io_x*xscale - moonrad, ju_z + io_z*zscale - moonrad, \
                               ju_x + io_x*xscale + moonrad, ju_z + io_z*zscale + moonrad, \
-                              fill="white", tags=("Io", str('% 5.2f' % io_x) ) )
+                              fill="white")
     eu_ball = sky.create_oval(ju_x + eu_x*xscale - moonrad, ju_z + eu_z*zscale - moonrad, \
                               ju_x + eu_x*xscale + moonrad, ju_z + eu_z*zscale + moonrad, \
-                              fill="white", tags=("Europa", str('% 5.2f' % eu_x) ) )
+                              fill="white")
     ga_ball = sky.create_oval(ju_x + ga_x*xscale - moonrad, ju_z + ga_z*zscale - moonrad, \
                               ju_x + ga_x*xscale + moonrad, ju_z + ga_z*zscale + moonrad, \
-                              fill="white", tags=("Ganymede", str('% 4.2f' % ga_x) ) )
+                              fill="white")
     ca_ball = sky.create_oval(ju_x + ca_x*xscale - moonrad, ju_z + ca_z*zscale - moonrad, \
                               ju_x + ca_x*xscale + moonrad, ju_z + ca_z*zscale + moonrad, \
-                              fill="white", tags=("Callisto", str('% 4.2f' % ca_x) ))
+                              fill="white")
     ju_ball = sky.create_oval(ju_x - juprad, ju_z -juprad, ju_x + juprad, ju_z + juprad, \
-                              fill="gray", tags=("Jupiter", "0" ) )
+                              fill="gray")
+
+    # name and position (Jupiter diameters) of each body, for mooncoords()
+    moontable.clear()
+    moontable.add(io_ball, name="Io", x=io_x, y=io_y, z=io_z)
+    moontable.add(eu_ball, name="Europa", x=eu_x, y=eu_y, z=eu_z)
+    moontable.add(ga_ball, name="Ganymede", x=ga_x, y=ga_y, z=ga_z)
+    moontable.add(ca_ball, name="Callisto", x=ca_x, y=ca_y, z=ca_z)
+    moontable.add(ju_ball, name="Jupiter", x=0., y=0., z=0.)
     if io_y < 0: sky.tag_raise(io_ball)
     if eu_y < 0: sky.tag_raise(eu_ball)
     if ga_y < 0: sky.tag_raise(ga_ball)
@@ -166,12 +177,38 @@ def updatemoons():
 
 
 
+# moon positions are computed for a 30-day window at once; rebuild the table
+# only when the current time falls outside of it or off its time grid
+def get_ephemeris():
+    global ephem, ttemp, deltat
+    if ephem is None or ttemp not in ephem:
+        ephem = build_table(bodies, ts, ttemp, deltat, ndays=30)
+    return ephem
+
+
+# open the ephemeris file and draw the moons after the window is on screen,
+# then report how long each stage of startup took
+def first_frame():
+    global bodies
+    window.update_idletasks()
+    twindow = time.perf_counter()
+    bodies = load_bodies(directory+'jup365.bsp')
+    tephem = time.perf_counter()
+    updatemoons()
+    sky.update_idletasks()
+    tframe = time.perf_counter()
+    print('Startup: window %.2f s, ephemeris %.2f s, moons %.2f s, time to first frame %.2f s' % \
+          (twindow - tstart, tephem - twindow, tframe - tephem, tframe - tstart))
+
+
 def deletemoons():
-    global io_ball, eu_ball, ga_ball, ca_ball
+    global io_ball, eu_ball, ga_ball, ca_ball, ju_ball
     sky.delete(io_ball)
     sky.delete(eu_ball)
     sky.delete(ga_ball)
     sky.delete(ca_ball)
+    sky.delete(ju_ball)
+    moontable.clear()
 
     
 def mooncoords(event):
@@ -180,10 +217,10 @@ def mooncoords(event):
     y = event.y
     #item= sky.find_overlapping(x-1, y-1, x+1, y+1)
     item = sky.find_closest(x, y, halo=2)
-    if sky.gettags(item) != ():
-        #print (sky.gettags(item)[0])
-        moonlabel.configure(text=sky.gettags(item)[0], font=("Ariel", 16))
-        poslabel.configure(text="x = "+ sky.gettags(item)[1] + " Jup. diameters", \
+    if len(item) > 0 and item[0] in moontable:
+        moon = moontable.lookup(item[0])
+        moonlabel.configure(text=moon['name'], font=("Ariel", 16))
+        poslabel.configure(text="x = "+ str('% 5.2f' % moon['x']) + " Jup. diameters", \
                            font=("Ariel", 16))
     else:
         moonlabel.configure(text="No moon at this location.", \
@@ -223,19 +260,16 @@ t = Time(ttemp)
 
 # plot the moons
 directory = './'
-moons = load_file(directory+'jup365.bsp')
-io = moons['IO']
-europa = moons['EUROPA']
-ganymede = moons['GANYMEDE']
-callisto = moons['CALLISTO']
-jupiter = moons['JUPITER BARYCENTER']
+bodies = None   # opened by first_frame() once the window is showing
+moontable = CanvasTable('name', 'x', 'y', 'z')
+ephem = None
+deltat = 2   # hours between observations, until an interval is selected
 #ts = load.timescale()
 ts = load.timescale(builtin=True)
 sky = tk.Canvas(moonframe, width=framewidth, height=frameheight/4)
 sky.config(bg="black")
 sky.place(relx=0, rely=0)
 sky.bind("<Button-1>", mooncoords)
-updatemoons()
 
 
 # display current moon and its position
@@ -282,6 +316,7 @@ setdatebtn.place(relx=0.75, rely=row_pos)
 # select observation interval
 row_pos= 0.6
 interval = tk.IntVar()
+interval.set(deltat)
 R1 = tk.Radiobutton(timeframe, text='2 hours', variable=interval, value=2, \
                     command=select_interval)
 R2 = tk.Radiobutton(timeframe, text='12 hours', variable=interval, value=12, \
@@ -314,6 +349,7 @@ quit_button.place(relwidth=0.7, relx=0.15, rely=row_pos)
 quit_button['command'] = window.destroy
 
 
+window.after_idle(first_frame)
 window.mainloop()
 
 
@@ -20,6 +20,7 @@ import astropy.units as u
 from astropy import constants as const
 from galpy.potential import MiyamotoNagaiPotential, NFWPotential, HernquistPotential
 from galpy.potential import plotRotcurve
+from scheduler import UpdateScheduler
 
 
 ####################################################################
@@ -35,13 +36,13 @@ def set_disk(value):
 	global logStellarMass
 	logStellarMass = slider_disk.get()
 	#print (logStellarMass)
-	plot_rotcurve()
+	redraw.request()
 	
 def set_halo(value):
 	global logHaloMass
 	logHaloMass = slider_halo.get()
 	#print (logHaloMass)
-	plot_rotcurve()
+	redraw.request()
 
 def plot_rotcurve():
 	global gal, index, logStellarMass, logHaloMass
@@ -109,6 +110,9 @@ framewidth = 900
 frameheight = 500
 window.geometry(str(framewidth)+'x'+str(frameheight))
 
+# merge bursts of slider events into one redraw per frame
+redraw = UpdateScheduler(window, plot_rotcurve)
+
 # frame to display menu options
 menuframe = tk.Frame(window, width=framewidth/3, height=frameheight)
 menuframe.grid_propagate(0)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coalescing redraw scheduler for slider-driven simulations.
+
+A tk.Scale calls its command for every intermediate value while it is being
+dragged.  Instead of redrawing each time, the slider callbacks only store the
+new value and call request() on an UpdateScheduler.  The first request starts
+a timer with the widget's after() method; any further requests before it fires
+are merged into the same render.  The render function reads the current
+settings when the timer fires, so it always draws the latest state and skips
+the intermediate ones.
+
+Example:
+    redraw = UpdateScheduler(window, plot_disk)
+
+    def set_rad(value):
+        global rad
+        rad = slider_rad.get()
+        redraw.request()
+"""
+
+
+
+class UpdateScheduler:
+    def __init__(self, widget, render, delay=30):
+        self.widget = widget
+        self.render = render
+        self.delay = delay      # frame budget in milliseconds
+        self.pending = None     # id of the scheduled after() call
+        self.events = 0         # number of requests received
+        self.frames = 0         # number of renders actually drawn
+
+    # ask for a redraw; bursts of requests are merged into one render
+    def request(self, *args):
+        self.events += 1
+        if self.pending is None:
+            self.pending = self.widget.after(self.delay, self.flush)
+
+    # draw now with the latest settings
+    def flush(self):
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+        self.frames += 1
+        self.render()
+
+    # number of intermediate requests that never needed their own render
+    def dropped(self):
+        return self.events - self.frames
+
+    def __repr__(self):
+        return 'UpdateScheduler(events=%d, frames=%d, dropped=%d)' % \
+            (self.events, self.frames, self.dropped())
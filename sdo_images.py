@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helpers for the HMI continuum images from NASA's Solar Dynamics Observatory
+used in the Rotation of the Sun simulation.
+"""
+
+import os
+import datetime as dt
+import numpy as np
+
+
+urlroot = 'http://jsoc.stanford.edu/data/hmi/images/'
+cachedir = os.path.join(os.path.expanduser('~'), '.introastrosim', 'sdo')
+
+
+
+# url of the 1k HMI continuum image taken at midnight on date t
+def sdo_url(t, root=urlroot):
+    tstring = t.strftime('%Y%m%d')
+    yearstring = t.strftime('%Y')
+    monthstring = t.strftime('%m')
+    daystring = t.strftime('%d')
+    return root + yearstring + '/' + monthstring + '/' + \
+        daystring + '/' + tstring + '_000000_Ic_1k.jpg'
+
+
+# filename of the same image in a local directory of saved images
+def sdo_filename(t, directory):
+    return os.path.join(directory, t.strftime('%Y%m%d') + '_000000_Ic_1k.jpg')
+
+
+# urls for the ndays days on either side of date t, nearest days first.
+# Days after today are left out, since their images do not exist yet.
+def neighbour_urls(t, ndays=2, root=urlroot, today=None):
+    if today is None:
+        today = dt.date.today()
+    urls = []
+    for i in range(1, ndays+1):
+        later = t + dt.timedelta(days=i)
+        if (later.date() if isinstance(later, dt.datetime) else later) <= today:
+            urls.append(sdo_url(later, root))
+        urls.append(sdo_url(t - dt.timedelta(days=i), root))
+    return urls
+
+
+# fit a circle to points x, y by linear least squares (Kasa method)
+def fit_circle(x, y):
+    A = np.column_stack([x, y, np.ones(len(x))])
+    b = x**2 + y**2
+    c = np.linalg.lstsq(A, b, rcond=None)[0]
+    xcent = c[0]/2
+    ycent = c[1]/2
+    radius = np.sqrt(c[2] + xcent**2 + ycent**2)
+    return xcent, ycent, radius
+
+
+# find the center and radius (in pixels) of the solar disk in an image.
+# The limb is taken as the first and last pixel brighter than threshold along
+# every row and column; points far from the fitted circle (labels, artifacts)
+# are rejected and the circle is fit again.
+def fit_limb(im, threshold=10, niter=3):
+    if im.ndim == 3:
+        im = im[:, :, 0]
+    disk = im >= threshold
+    ny, nx = disk.shape
+
+    rows = np.nonzero(disk.any(axis=1))[0]
+    cols = np.nonzero(disk.any(axis=0))[0]
+    left = np.argmax(disk[rows, :], axis=1) - 0.5
+    right = nx - np.argmax(disk[rows, ::-1], axis=1) - 0.5
+    top = np.argmax(disk[:, cols], axis=0) - 0.5
+    bottom = ny - np.argmax(disk[::-1, cols], axis=0) - 0.5
+
+    x = np.concatenate([left, right, cols, cols]).astype(float)
+    y = np.concatenate([rows, rows, top, bottom]).astype(float)
+    # where the disk is clipped by the frame, its edge is the image border, not the limb
+    inside = (x > -0.5) & (x < nx - 0.5) & (y > -0.5) & (y < ny - 0.5)
+    x = x[inside]
+    y = y[inside]
+    if len(x) < 3:
+        raise ValueError('no solar disk found in image')
+
+    xcent, ycent, radius = fit_circle(x, y)
+    for i in range(niter):
+        resid = np.abs(np.hypot(x - xcent, y - ycent) - radius)
+        good = resid < np.maximum(3*np.median(resid), 2)
+        x = x[good]
+        y = y[good]
+        xcent, ycent, radius = fit_circle(x, y)
+    return xcent, ycent, radius
+
+
+# approximate latitude and longitude (degrees) of image pixels x, y on a disk
+# with the given center and radius; nan outside the disk.  This neglects the
+# tilt of the spacecraft orbit relative to the solar equator.
+def heliographic(x, y, xcent, ycent, pixrad):
+    xsun = (np.asarray(x) - xcent) / pixrad
+    ysun = (np.asarray(y) - ycent) / pixrad
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.sqrt(1 - xsun**2 - ysun**2)
+        latitude = np.arcsin(ysun) * 180/np.pi
+        longitude = np.arctan(xsun/z) * 180/np.pi
+    outside = xsun**2 + ysun**2 >= 1
+    latitude = np.where(outside, np.nan, latitude)
+    longitude = np.where(outside, np.nan, longitude)
+    return latitude, longitude
+
+
+# latitude and longitude maps (float32, degrees) for every pixel of an image of
+# the given shape, so that clicks or overlays are simple array lookups
+def heliographic_grid(shape, xcent, ycent, pixrad):
+    ny, nx = shape[0], shape[1]
+    x = np.arange(nx, dtype=np.float32)[np.newaxis, :]
+    y = np.arange(ny, dtype=np.float32)[:, np.newaxis]
+    latitude, longitude = heliographic(x, y, np.float32(xcent), np.float32(ycent), \
+                                       np.float32(pixrad))
+    return latitude.astype(np.float32), longitude.astype(np.float32)
@@ -17,12 +17,18 @@ relative to the solar equator.
 """
 
 
+import time
+import socket
+import urllib.error
 import tkinter as tk
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np 
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from imageio.v2 import imread
+from url_cache import UrlCache, Prefetcher, FetchCancelled
+from sdo_images import sdo_url, neighbour_urls, fit_limb, heliographic_grid, cachedir
 
 
 
@@ -46,13 +52,7 @@ class LabeledEntry(tk.Entry):
             
 def generate_url():
     global t, urlstring
-    tstring = t.strftime('%Y%m%d')
-    yearstring = t.strftime('%Y')
-    monthstring = t.strftime('%m')
-    daystring = t.strftime('%d')
-    urlroot = 'http://jsoc.stanford.edu/data/hmi/images/'
-    urlstring = urlroot + yearstring + '/' + monthstring + '/' + \
-        daystring + '/' + tstring + '_000000_Ic_1k.jpg'
+    urlstring = sdo_url(t)
 
 
 def setdate():
@@ -64,10 +64,7 @@ def setdate():
         try:
             t = dt.datetime(newyear, newmonth, newday, 0, 0, 0, 0)
             datelbl.configure(text=t.strftime("%B %d, %Y"))
-            generate_url()
-            plot_sun()
-            poslabel1.configure(text="Click a sunspot to measure its position!")
-            poslabel2.configure(text="")
+            request_sun()
         except ValueError:
             datelbl.configure(text="Oops, that date isn't available!")
 
@@ -79,58 +76,111 @@ def forwardclick():
     global t
     t += dt.timedelta(hours=24)
     datelbl.configure(text=t.strftime("%B %d, %Y"))
-    try:
-        generate_url()
-        plot_sun()
-        poslabel1.configure(text="Click a sunspot to measure its position!")
-        poslabel2.configure(text="")
-    except:
-        datelbl.configure(text="Oops, that date isn't available!")
+    request_sun()
 
     
 def backclick():
     global t
     t += dt.timedelta(hours=-24)
     datelbl.configure(text=t.strftime("%B %d, %Y"))
-    try:
-        generate_url()
-        plot_sun()
-        poslabel1.configure(text="Click a sunspot to measure its position!")
-        poslabel2.configure(text="")
-    except:
-        datelbl.configure(text="Oops, that date isn't available!")
+    request_sun()
 
 
 def resetclick():
     global t
     t = dt.date.today()
     datelbl.configure(text=t.strftime("%B %d, %Y"))
+    request_sun()
+
+
+# start downloading the image for date t in the background.  Only the most
+# recent request is ever drawn: older ones are dropped from the queue, and
+# downloads already running stop at their next chunk (see load_image).
+def request_sun():
+    global t, urlstring, request_id, request_future
     generate_url()
-    plot_sun()
+    if request_future is not None:
+        request_future.cancel()
+    request_id += 1
+    request_future = loader.submit(load_image, urlstring, request_id)
+    statuslbl.configure(text="Loading image...")
     poslabel1.configure(text="Click a sunspot to measure its position!")
-    poslabel2.configure(text="")    
+    poslabel2.configure(text="")
+    window.after(50, check_sun, request_id, request_future)
+
+
+# runs in a worker thread, so it must not touch any tk widgets.  The download
+# stops as soon as a newer date is requested, or fetch_timeout seconds after it
+# started (time spent waiting in the queue does not count).
+# The fitted disk geometry is kept for each url, like the image itself.
+def load_image(url, rid):
+    start = time.perf_counter()
+
+    def stop():
+        return rid != request_id or time.perf_counter() - start > fetch_timeout
+
+    if rid != request_id:
+        raise FetchCancelled(url)
+    try:
+        im = imread(cache.fetch(url, cancelled=stop))
+    except FetchCancelled:
+        if rid == request_id:
+            raise TimeoutError(url)
+        raise
+    if url not in limbfits:
+        limbfits[url] = fit_limb(im)
+    return im, limbfits[url]
+
+
+# poll the background download from the tk mainloop and draw it when ready
+def check_sun(rid, future):
+    global request_id
+    if rid != request_id:   # a newer date was requested in the meantime
+        return
+    if not future.done():
+        window.after(50, check_sun, rid, future)
+        return
+
+    try:
+        im, geometry = future.result()
+    except FetchCancelled:
+        return
+    except (TimeoutError, socket.timeout):
+        statuslbl.configure(text="The image server is not responding.")
+        return
+    except urllib.error.HTTPError:
+        statuslbl.configure(text="")
+        datelbl.configure(text="Oops, that date isn't available!")
+        return
+    except urllib.error.URLError as err:
+        if isinstance(err.reason, (TimeoutError, socket.timeout)):
+            statuslbl.configure(text="The image server is not responding.")
+        else:
+            statuslbl.configure(text="Could not connect to the image server.")
+        return
+    except (OSError, ValueError):   # missing or unreadable image
+        statuslbl.configure(text="")
+        datelbl.configure(text="Oops, that date isn't available!")
+        return
+
+    statuslbl.configure(text="")
+    plot_sun(im, geometry)
 
     
 def sunspot_coords(event):
-    global pixrad, xcent, ycent
+    global latgrid, longrid
 	
-    try:
-        x = event.xdata - xcent
-        y = event.ydata - ycent
-    except:
-        x = 999
-        y = 999
-		
-    spotr = np.sqrt(x**2 + y**2)/pixrad
-    xsun = x/pixrad
-    ysun = y/pixrad
-
-    if spotr < 1:
-
-        # calculate sunspot latitude & longitude here...
-        z = np.sqrt(1 - xsun**2 - ysun**2)
-        latitude = np.arcsin(ysun) * 180/np.pi
-        longitude = np.arctan(xsun/z) * 180/np.pi
+    # look up the latitude & longitude of the clicked pixel
+    latitude = np.nan
+    longitude = np.nan
+    if event.xdata is not None and event.ydata is not None:
+        i = int(round(event.ydata))
+        j = int(round(event.xdata))
+        if 0 <= i < latgrid.shape[0] and 0 <= j < latgrid.shape[1]:
+            latitude = latgrid[i, j]
+            longitude = longrid[i, j]
+
+    if np.isfinite(latitude):   # nan outside of the solar disk
     
         # display values on the menuframe...
         latstr = "{:.2f}".format(latitude)
@@ -143,7 +193,15 @@ def sunspot_coords(event):
         poslabel2.configure(text="")
 
 
-def plot_sun():
+# latitude & longitude of every pixel, rebuilt only when the disk geometry changes
+def update_coord_grid(shape, geometry):
+    global latgrid, longrid, gridgeometry
+    if (shape[:2], geometry) != gridgeometry:
+        latgrid, longrid = heliographic_grid(shape, *geometry)
+        gridgeometry = (shape[:2], geometry)
+
+
+def plot_sun(im, geometry):
     global urlstring, pixrad, xcent, ycent
 
     # this method works, but does not resize image
@@ -156,7 +214,7 @@ def plot_sun():
     #label.pack()
 
     # this method works better for custom sizing and overplotting    
-    im = imread(urlstring)
+    # (the image is downloaded by load_image in a background thread)
     f = Figure(figsize=(8,8), dpi=100)
     f.subplots_adjust(left=0.1, bottom=0.1)
     f.text(0.2, 0.07, "Courtesy of NASA/SDO and the AIA, EVE, and HMI science teams.")
@@ -165,16 +223,10 @@ def plot_sun():
     a.axis('off')
 
 
-    # measure radius of sun image in pixel units (changes over time as satellite moves)
-    # this method slices the image at the midpoint to find pixels where image is not black
-    Npix = 1024
-    xcent = int(Npix/2)
-    ycent = int(Npix/2)
-    tmp = np.zeros(Npix)
-    for i in range(Npix):
-        tmp[i] = im[i, int(Npix/2), :][0]
-    high = np.where(tmp >= 10, 1, 0)
-    pixrad = np.sum(high)/2
+    # center and radius of sun image in pixel units (changes over time as satellite moves),
+    # fit to the limb by load_image
+    xcent, ycent, pixrad = geometry
+    update_coord_grid(im.shape, geometry)
     
     # draw green circle at the limb to confirm image radius
     #theta = np.arange(0, 2*np.pi, 2*np.pi/1000)
@@ -191,6 +243,9 @@ def plot_sun():
     # click on plot to get sunspot coords
     f.canvas.mpl_connect('button_press_event', sunspot_coords)
 
+    # download the neighbouring days while the student looks at this one
+    prefetcher.prefetch(neighbour_urls(t, ndays=3))
+
     
 ###########################################################
 
@@ -214,16 +269,20 @@ imageframe = tk.Frame(window, width=framewidth*2/3, height=frameheight)
 imageframe.grid_propagate(0)
 imageframe.place(x=0, y=0)
 
+
+# local cache of SDO images, so each day is only downloaded once
+cache = UrlCache(cachedir, max_bytes=200e6, timeout=20)
+prefetcher = Prefetcher(cache)
+limbfits = {}   # solar disk center and radius for each image url
+gridgeometry = None   # image shape and disk geometry of latgrid, longrid
+
     
-# Get current date and image
+# Get current date; its image is requested once the menu is in place
 t = dt.date.today()
-try:
-    generate_url()
-except:
-	t += dt.timedelta(hours=-24)
-	generate_url()
-	
-plot_sun()
+loader = ThreadPoolExecutor(max_workers=2)
+fetch_timeout = 30   # seconds
+request_id = 0
+request_future = None
 
 
 # place the data acknowledement labels
@@ -251,6 +310,8 @@ label1 = tk.Label(menuframe, text="Currently showing: ")
 label1.place(relx = 0.05, rely=row_pos)
 datelbl = tk.Label(menuframe, text=t.strftime("%B %d, %Y"))
 datelbl.place(relx=0.4, rely=row_pos)
+statuslbl = tk.Label(menuframe, text="")
+statuslbl.place(relx=0.4, rely=row_pos-.03)
 
 
 # buttons to fast-forward or rewind 24 hours
@@ -291,4 +352,9 @@ quit_button.place(relwidth=0.7, relx=0.15, rely=row_pos)
 quit_button['command'] = window.destroy
 
 
-window.mainloop()
\ No newline at end of file
+request_sun()
+window.mainloop()
+# stop the downloads still running, so the program can exit without waiting for them
+request_id += 1
+prefetcher.shutdown()
+loader.shutdown(wait=False, cancel_futures=True)
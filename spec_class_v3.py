@@ -15,6 +15,9 @@ This version of the simulation accesses the spectral library directly from the
 noao.edu website.  Note that the URL may need updating in the near future to 
 reflect the name change from NOAO to NSF's NOIR Lab.
 
+The spectra are downloaded only once, in parallel, into a local mirror
+(~/.introastrosim/cflib), so later runs do not need the website.
+
 Consider adding more stars of different spectral types.  Full list is available here:
 https://iopscience.iop.org/article/10.1086/386343/fulltext/59155.html?doi=10.1086/386343
 
@@ -26,12 +29,12 @@ https://iopscience.iop.org/article/10.1086/386343/fulltext/59155.tables.html?doi
 import tkinter as tk
 import pandas as pd
 import numpy as np 
-import urllib
 from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg)
 from matplotlib.backend_bases import key_press_handler
 from matplotlib.figure import Figure
 from astropy.io import fits
 from scipy import stats
+from spectrum_source import open_source
 
 
 
@@ -50,30 +53,9 @@ def set_sptype():
     
 def plot_spectra():
     global star, sptype, HIvar, HeIvar
-    f1 = urllib.request.urlopen(url+stdlist[sptype]+'.txt')
-    f2 = urllib.request.urlopen(url+starlist[star]+'.txt')
-
-    # read file 1
-    for i in range(32):
-        header = f1.readline()
-    w1 = []
-    s1 = []
-    for line in f1:
-        line = line.strip()
-        columns = line.split()
-        w1.append(float(columns[0]))
-        s1.append(float(columns[1]))
-        
-    # read file 2
-    for i in range(32):
-        header = f2.readline()
-    w2 = []
-    s2 = []
-    for line in f2:
-        line = line.strip()
-        columns = line.split()
-        w2.append(float(columns[0]))
-        s2.append(float(columns[1]))
+    # spectra are downloaded once into a local mirror (see spectrum_source.py)
+    w1, s1 = source.spectrum(stdlist[sptype]+'.txt')
+    w2, s2 = source.spectrum(starlist[star]+'.txt')
     
     # bin spectra to lower resolution
     w_binned = np.arange(3900, 7100, 4)
@@ -209,7 +191,7 @@ graphframe.place(x=framewidth/3, y=0)
 
 
 # List of unknown stars and their filenames
-url = "https://www.noao.edu/cflib/V1/TEXT/"
+url = "https://www.noao.edu/cflib/V1/TEXT/"   # or a local directory of the text files
 starfilelist = ['11636', '15335', '16673', '16895', '28099', '40136', \
                 '58946', '65900', '70110', '78558', '87822', '91752', \
                 '111721', '116656', '130109', '136729', '149630', \
@@ -249,6 +231,10 @@ stdfilelist = ['149757', '193536', '158148', '172958', '103287', '106591', \
             '32923', '10700']
 stdlist = dict(zip(sptypelist, stdfilelist))
 
+# download all the spectra in the background while the window opens
+source = open_source(url)
+source.prefetch([name+'.txt' for name in starfilelist + stdfilelist])
+
 
 # Display menu of known spectral types
 row_pos = 0.3
@@ -308,3 +294,4 @@ plot_spectra()
 
 
 window.mainloop()
+source.close()
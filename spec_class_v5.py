@@ -30,13 +30,12 @@ v5: Simplified the interface to select stars and spectral types.
 """
 
 import tkinter as tk
-import pandas as pd
-import numpy as np 
 from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg)
 from matplotlib.backend_bases import key_press_handler
 from matplotlib.figure import Figure
-from astropy.io import fits
-from scipy import stats
+from spectrum_store import open_store
+from spectrum_source import open_source
+from cflib_stars import starfilelist, stdfilelist
 
 
 
@@ -54,128 +53,71 @@ def set_sptype(option):
     #print (sptype, stdlist[sptype])
     plot_spectra()
     
-def plot_spectra():
-    global star, sptype, HIvar, HeIvar
-    spec1 = fits.open(dir+stdlist[sptype])
-    spec2 = fits.open(dir+starlist[star])
-    w0 = spec1[0].header['CRVAL1']  # all CF library spectra are 
-    dw = spec1[0].header['CDELT1']  # on the same wavelength grid
-    Nw = spec1[0].header['NAXIS1']
-    w = np.arange(w0, w0+dw*Nw-dw, dw)
-    s1 = spec1[0].data
-    s2 = spec2[0].data
-    
-    # bin spectra to lower resolution
-    w_binned = np.arange(3900, 7100, 4)
-    s1_binned, w_binned, bin_number = stats.binned_statistic(w, s1, statistic='mean', bins=w_binned)
-    s2_binned, w_binned, bin_number = stats.binned_statistic(w, s2, statistic='mean', bins=w_binned)
+# build the figure once; plot_spectra and set_lines only update its artists
+def setup_spectra():
+    global specplot, specaxes, unkline, stdline, diffline, markers
     
-    # plot star, spectral standard, and difference spectra
     f = Figure(figsize=(6,5), dpi=100)
     #f = Figure()
     f.subplots_adjust(left=0.1, bottom=0.1)
     a = f.add_subplot(111)
-    if showunk.get() == 1:
-        a.plot(w_binned[:-1]/10, s2_binned, 'b-', label=star)
-    if showstd.get() == 1:
-        a.plot(w_binned[:-1]/10, s1_binned, 'r-', label=sptype)
-    if showdiff.get() == 1:
-        a.plot(w_binned[:-1]/10, s1_binned-s2_binned, 'g-', label='Difference')
-    a.legend(loc='upper right')
+    unkline, = a.plot([], [], 'b-')
+    stdline, = a.plot([], [], 'r-')
+    diffline, = a.plot([], [], 'g-', label='Difference')
     a.set_xlabel('Wavelength (nm)')
     a.set_ylabel('Relative Intensity')
     a.set_xlim([390, 710])
     a.set_ylim([-0.5, 4])
     #a.set_title('Plot Title Here')
     
-    # mark spectral lines
-    if HIvar.get() == 1: 
-        a.plot([397.0, 397.0], [-10,10], 'c:')
-        a.plot([410.2, 410.2], [-10,10], 'c:')
-        a.plot([434.0, 434.0], [-10,10], 'c:')
-        a.plot([486.1, 486.1], [-10,10], 'c:')
-        a.plot([656.3, 656.3], [-10,10], 'c:')
-        a.text(660, -0.3, 'H I', fontsize=12, color='c')
-        
-    if HeIvar.get() == 1:
-        a.plot([400.9, 400.9], [-10,10], 'm:')
-        a.plot([402.6, 402.6], [-10,10], 'm:')
-        a.plot([414.4, 414.4], [-10,10], 'm:')
-        a.plot([438.7, 438/7], [-10,10], 'm:')
-        a.plot([447.1, 447.1], [-10,10], 'm:')
-        a.plot([471.3, 471.3], [-10,10], 'm:')
-        a.plot([492.1, 492.1], [-10,10], 'm:')
-        a.plot([501.6, 501.6], [-10,10], 'm:')
-        a.plot([504.7, 504.7], [-10,10], 'm:')
-        a.plot([587.6, 587.6], [-10,10], 'm:')
-        a.plot([706.5, 706.5], [-10,10], 'm:')
-        a.text(590, -0.3, 'He I', fontsize=12, color='m')
-        
-    if CaIIvar.get() == 1:
-        a.plot([396.9, 396.9], [-10,10], ':', color='limegreen')
-        a.plot([393.4, 393.4], [-10,10], ':', color='limegreen')
-        a.text(400, -0.3, 'Ca II', fontsize=12, color='limegreen')
-    
-    if NaIvar.get() == 1:
-        a.plot([589.0, 589.0], [-10,10], ':', color='teal')
-        a.text(595, -0.3, 'Na I', fontsize=12, color='teal')
-    
-    if FeIvar.get() == 1:
-        a.plot([400.524, 400.524], [-10,10], ':', color='orange')
-        a.plot([404.581, 404.581], [-10,10], ':', color='orange')
-        a.plot([406.359, 406.359], [-10,10], ':', color='orange')
-        a.plot([407.173, 407.173], [-10,10], ':', color='orange')
-        a.plot([413.205, 413.205], [-10,10], ':', color='orange')
-        a.plot([414.386, 414.386], [-10,10], ':', color='orange')
-        a.plot([419.909, 419.909], [-10,10], ':', color='orange')
-        a.plot([420.202, 420.202], [-10,10], ':', color='orange')
-        a.plot([425.078, 425.078], [-10,10], ':', color='orange')
-        a.plot([426.047, 426.047], [-10,10], ':', color='orange')
-        a.plot([427.176, 427.176], [-10,10], ':', color='orange')
-        a.plot([430.790, 430.790], [-10,10], ':', color='orange')
-        a.plot([432.576, 432.576], [-10,10], ':', color='orange')
-        a.plot([437.592, 437.592], [-10,10], ':', color='orange')
-        a.plot([440.475, 440.475], [-10,10], ':', color='orange')
-        a.plot([441.512, 441.512], [-10,10], ':', color='orange')
-        a.plot([442.730, 442.730], [-10,10], ':', color='orange')
-        a.plot([487.131, 487.131], [-10,10], ':', color='orange')
-        a.plot([489.149, 489.149], [-10,10], ':', color='orange')
-        a.plot([492.050, 492.050], [-10,10], ':', color='orange')
-        a.plot([495.759, 495.759], [-10,10], ':', color='orange')
-        a.plot([516.748, 516.748], [-10,10], ':', color='orange')
-        a.plot([517.159, 517.159], [-10,10], ':', color='orange')
-        a.plot([522.718, 522.718], [-10,10], ':', color='orange')
-        a.plot([523.294, 523.294], [-10,10], ':', color='orange')
-        a.plot([526.953, 526.953], [-10,10], ':', color='orange')
-        a.plot([527.035, 527.035], [-10,10], ':', color='orange')
-        a.plot([532.803, 532.803], [-10,10], ':', color='orange')
-        a.plot([537.148, 537.148], [-10,10], ':', color='orange')
-        a.plot([539.712, 539.712], [-10,10], ':', color='orange')
-        a.plot([540.577, 540.577], [-10,10], ':', color='orange')
-        a.plot([544.691, 544.691], [-10,10], ':', color='orange')
-        a.plot([606.548, 606.548], [-10,10], ':', color='orange')
-        a.plot([613.769, 613.769], [-10,10], ':', color='orange')
-        a.plot([619.155, 619.155], [-10,10], ':', color='orange')
-        a.plot([623.072, 623.072], [-10,10], ':', color='orange')
-        a.plot([625.255, 625.255], [-10,10], ':', color='orange')
-        a.plot([630.150, 630.150], [-10,10], ':', color='orange')
-        a.plot([631.801, 631.801], [-10,10], ':', color='orange')
-        a.plot([633.682, 633.682], [-10,10], ':', color='orange')
-        a.plot([639.360, 639.360], [-10,10], ':', color='orange')
-        a.plot([640.000, 640.000], [-10,10], ':', color='orange')
-        a.plot([641.164, 641.164], [-10,10], ':', color='orange')
-        a.plot([642.135, 642.135], [-10,10], ':', color='orange')
-        a.plot([643.084, 643.084], [-10,10], ':', color='orange')
-        a.plot([649.498, 649.498], [-10,10], ':', color='orange')
-        a.plot([654.623, 654.623], [-10,10], ':', color='orange')
-        a.plot([659.291, 659.291], [-10,10], ':', color='orange')
-        a.plot([667.798, 667.798], [-10,10], ':', color='orange')
-        a.text(670, -0.3, 'Fe I', fontsize=12, color='orange')
+    # one collection of dotted lines per atomic species, hidden until its box is checked
+    markers = {}
+    for species in linelist:
+        waves, color, labelx = linelist[species]
+        lines = a.vlines(waves, -10, 10, colors=color, linestyles=':')
+        label = a.text(labelx, -0.3, species, fontsize=12, color=color)
+        lines.set_visible(False)
+        label.set_visible(False)
+        markers[species] = (lines, label)
+    specaxes = a
  
     f.tight_layout()
-    plot = FigureCanvasTkAgg(f, master=graphframe)  # A tk.DrawingArea.
-    plot.draw()
-    plot.get_tk_widget().place(relx=0, rely=0)
+    specplot = FigureCanvasTkAgg(f, master=graphframe)  # A tk.DrawingArea.
+    specplot.get_tk_widget().place(relx=0, rely=0)
+
+
+def plot_spectra():
+    global star, sptype
+    # bin spectra to lower resolution; all CF library spectra are on the same
+    # wavelength grid, and are binned once and kept by the store (see spectrum_store.py)
+    w_binned, s1_binned = store.binned(stdlist[sptype], binwidth)
+    w_binned, s2_binned = store.binned(starlist[star], binwidth)
+    
+    # plot star, spectral standard, and difference spectra
+    unkline.set_data(w_binned[:-1]/10, s2_binned)
+    unkline.set_label(star)
+    unkline.set_visible(showunk.get() == 1)
+    stdline.set_data(w_binned[:-1]/10, s1_binned)
+    stdline.set_label(sptype)
+    stdline.set_visible(showstd.get() == 1)
+    diffline.set_data(w_binned[:-1]/10, s1_binned-s2_binned)
+    diffline.set_visible(showdiff.get() == 1)
+    shown = [line for line in [unkline, stdline, diffline] if line.get_visible()]
+    if len(shown) > 0:
+        specaxes.legend(handles=shown, loc='upper right')
+    elif specaxes.get_legend() is not None:
+        specaxes.get_legend().remove()
+    set_lines()
+
+
+# show or hide the spectral line markers for each checked species
+def set_lines():
+    for species in linelist:
+        show = linevars[species].get() == 1
+        lines, label = markers[species]
+        lines.set_visible(show)
+        label.set_visible(show)
+    specplot.draw_idle()
 
 
 
@@ -200,20 +142,8 @@ graphframe.grid_propagate(0)
 graphframe.place(x=framewidth/3, y=0)
 
 
-# List of unknown stars and their filenames
-dir = "/Users/gmcswain/Research/CFlibrary/"
-starfilelist = ['A5V.hd11636.fits', 'G0V.hd15335.fits', 'F6V.hd16673.fits', \
-                'F7V.hd16895.fits', 'G2V.hd28099.fits', 'F1V.hd40136.fits', \
-                'F0V.hd58946.fits', 'A1V.hd65900.fits', 'F9V.hd70110.fits', \
-                'G3V.hd78558.fits', 'F4V.hd87822.fits', 'F3V.hd91752.fits', \
-                'G6V.hd111721.fits', 'A2V.hd116656.fits',  \
-                'A0V.hd130109.fits', 'A4V.hd136729.fits', 'B9V.hd149630.fits', \
-                'A3V.hd151431.fits', 'A7V.hd153653.fits', 'B1V.hd154445.fits', \
-                'A8V.hd158352.fits', \
-                'B5V.hd173087.fits', 'B6V.hd173936.fits', 'B7V.hd177817.fits', \
-                'A6V.hd186307.fits', \
-                'B4V.hd189944.fits', 'B3V.hd190993.fits', 'O9V.hd193322.fits', \
-                'B8V.hd207516.fits', 'B2V.hd212978.fits']
+# List of unknown stars, from their filenames (listed in cflib_stars.py)
+dir = "/Users/gmcswain/Research/CFlibrary/"   # or the url of a web copy of the library
 starnamelist = []
 for star in starfilelist:
     temp = star.split('.')[1]
@@ -240,18 +170,34 @@ showunkbox = tk.Checkbutton(menuframe, text="Show unknown star", variable=showun
 showunkbox.place(relx = 0.2, rely = row_pos+0.1)
 
 
-# List of spectral type filenames and their spec types
-stdfilelist = ['O9V.hd149757.fits', 'B2V.hd193536.fits', 'B5V.hd158148.fits', \
-            'B8V.hd172958.fits', 'A0V.hd103287.fits', 'A3V.hd106591.fits', \
-            'A6V.hd186307.fits', 'A8V.hd155514.fits', 'F2V.hd33256.fits', \
-            'F5V.hd11592.fits', 'F8V.hd11007.fits', 'G1V.hd89707.fits', \
-            'G4V.hd32923.fits', 'G8V.hd10700.fits']
+# Spectral types of the standards (filenames listed in cflib_stars.py)
 sptypelist = []
 for std in stdfilelist:
     sptypelist.append(std[0:2])
 stdlist = dict(zip(sptypelist, stdfilelist))
 
 
+# Atomic spectral lines to mark: wavelengths (nm), color, and position of the label
+linelist = {'H I': ([397.0, 410.2, 434.0, 486.1, 656.3], 'c', 660), \
+            'He I': ([400.9, 402.6, 414.4, 438.7, 447.1, 471.3, 492.1, 501.6, \
+                      504.7, 587.6, 706.5], 'm', 590), \
+            'Ca II': ([396.9, 393.4], 'limegreen', 400), \
+            'Na I': ([589.0], 'teal', 595), \
+            'Fe I': ([400.524, 404.581, 406.359, 407.173, 413.205, 414.386, 419.909, \
+                      420.202, 425.078, 426.047, 427.176, 430.790, 432.576, 437.592, \
+                      440.475, 441.512, 442.730, 487.131, 489.149, 492.050, 495.759, \
+                      516.748, 517.159, 522.718, 523.294, 526.953, 527.035, 532.803, \
+                      537.148, 539.712, 540.577, 544.691, 606.548, 613.769, 619.155, \
+                      623.072, 625.255, 630.150, 631.801, 633.682, 639.360, 640.000, \
+                      641.164, 642.135, 643.084, 649.498, 654.623, 659.291, 667.798], 'orange', 670)}
+
+
+# pack all spectra into a single file the first time the simulation runs
+source = open_source(dir)
+store = open_store(source, starfilelist + stdfilelist)
+binwidth = 4   # Angstroms
+
+
 # Display menu of known spectral types
 row_pos = 0.3
 sptypevar = tk.StringVar(menuframe)
@@ -280,24 +226,25 @@ atomlbl = tk.Label(menuframe, text="Mark positions of atomic spectral lines: ")
 atomlbl.place(relx=0.1, rely=row_pos)
 HIvar = tk.IntVar()
 HIvar.set(0)
-HI = tk.Checkbutton(menuframe, text="H I", variable=HIvar, onvalue=1, offvalue=0, command=plot_spectra)
+HI = tk.Checkbutton(menuframe, text="H I", variable=HIvar, onvalue=1, offvalue=0, command=set_lines)
 HI.place(relx = 0.2, rely = row_pos+0.05)
 HeIvar = tk.IntVar()
 HeIvar.set(0)
-HeI = tk.Checkbutton(menuframe, text="He I", variable=HeIvar, onvalue=1, offvalue=0, command=plot_spectra)
+HeI = tk.Checkbutton(menuframe, text="He I", variable=HeIvar, onvalue=1, offvalue=0, command=set_lines)
 HeI.place(relx = 0.2, rely = row_pos+0.1)
 CaIIvar = tk.IntVar()
 CaIIvar.set(0)
-CaII = tk.Checkbutton(menuframe, text="Ca II", variable=CaIIvar, onvalue=1, offvalue=0, command=plot_spectra)
+CaII = tk.Checkbutton(menuframe, text="Ca II", variable=CaIIvar, onvalue=1, offvalue=0, command=set_lines)
 CaII.place(relx = 0.2, rely = row_pos+0.15)
 NaIvar = tk.IntVar()
 NaIvar.set(0)
-NaI = tk.Checkbutton(menuframe, text="Na I", variable=NaIvar, onvalue=1, offvalue=0, command=plot_spectra)
+NaI = tk.Checkbutton(menuframe, text="Na I", variable=NaIvar, onvalue=1, offvalue=0, command=set_lines)
 NaI.place(relx = 0.6, rely = row_pos+0.05)
 FeIvar = tk.IntVar()
 FeIvar.set(0)
-FeI = tk.Checkbutton(menuframe, text="Fe I", variable=FeIvar, onvalue=1, offvalue=0, command=plot_spectra)
+FeI = tk.Checkbutton(menuframe, text="Fe I", variable=FeIvar, onvalue=1, offvalue=0, command=set_lines)
 FeI.place(relx = 0.6, rely = row_pos+0.1)
+linevars = {'H I': HIvar, 'He I': HeIvar, 'Ca II': CaIIvar, 'Na I': NaIvar, 'Fe I': FeIvar}
 
 
 row_pos = 0.9
@@ -306,7 +253,9 @@ quit_button.place(relwidth=0.7, relx=0.15, rely=row_pos)
 quit_button['command'] = window.destroy
 
 
+setup_spectra()
 plot_spectra()
 
 
 window.mainloop()
+source.close()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Automatic spectral classification of the unknown stars in spec_class_v5.py.
+
+Every unknown spectrum is compared with every standard at once: the binned
+spectra from the SpectrumStore are scaled to a mean of 1, and the chi-square
+of each unknown against each standard (after the best-fitting scale factor) is
+one matrix product over the wavelength bins.  The standards are then ranked by
+chi-square, and a parabola through the best standard and its neighbours gives
+an interpolated sub-type between the standards.
+
+The filenames of the CF library spectra start with their published spectral
+types, so running this file checks an answer key for the whole lab, e.g.
+    python spec_match.py /path/to/CFlibrary/
+    python spec_match.py http://localhost:8000/CFlibrary/
+"""
+
+import numpy as np
+
+
+spectral_classes = 'OBAFGKM'
+
+
+
+# spectral type as a number, e.g. 'B2' -> 12, 'G8' -> 48
+def type_number(sptype):
+    return 10*spectral_classes.index(sptype[0]) + float(sptype[1:])
+
+
+# spectral type from a number, rounded to the nearest sub-type
+def type_name(number):
+    number = int(np.clip(np.round(number), 0, 10*len(spectral_classes) - 1))
+    return spectral_classes[number // 10] + str(number % 10)
+
+
+# spectral type at the start of a CF library filename, e.g. 'A5V.hd11636.fits' -> 'A5'
+def filename_type(filename):
+    return filename.split('.')[0].rstrip('IV')
+
+
+# scale each spectrum (row) to a mean of 1 over the bins where all spectra have data
+def normalize(binned, good):
+    binned = binned[:, good]
+    return binned / binned.mean(axis=1)[:, np.newaxis]
+
+
+# chi-square per bin of each unknown (rows) against each standard (columns),
+# with every standard scaled to best fit the unknown:
+#     chi2 = sum((u - a*s)**2) = u.u - (u.s)**2 / s.s  for the best scale a
+def chi2_matrix(unknowns, standards):
+    us = unknowns @ standards.T
+    uu = np.sum(unknowns**2, axis=1)[:, np.newaxis]
+    ss = np.sum(standards**2, axis=1)[np.newaxis, :]
+    return np.maximum(uu - us**2/ss, 0) / unknowns.shape[1]
+
+
+# sub-type at the minimum of a parabola through the best standard and its
+# neighbours on either side; the best standard's type at the ends of the grid
+def interpolate_type(numbers, chi2, best):
+    if best == 0 or best == len(numbers) - 1:
+        return numbers[best]
+    x = numbers[best-1:best+2]
+    a, b, c = np.polyfit(x - x[1], chi2[best-1:best+2], 2)
+    if a <= 0:
+        return numbers[best]
+    return np.clip(x[1] - b/(2*a), x[0], x[2])
+
+
+# classify unknown spectra against standard spectra, all taken from a
+# SpectrumStore.  stdlist maps spectral types to filenames.  Returns, for each
+# unknown, a list of (sptype, chi2) sorted from best to worst match and the
+# interpolated spectral type.
+def classify(store, unknowns, stdlist, width=4, wmin=3900, wmax=7100):
+    sptypes = list(stdlist)
+    edges, binned = store.binned_all(width, wmin, wmax)
+    rows_unk = [store.rows[name] for name in unknowns]
+    rows_std = [store.rows[stdlist[sptype]] for sptype in sptypes]
+    good = np.all(np.isfinite(binned[rows_unk + rows_std]), axis=0)
+    chi2 = chi2_matrix(normalize(binned[rows_unk], good), \
+                       normalize(binned[rows_std], good))
+
+    # interpolate along the standards in order of spectral type
+    numbers = np.array([type_number(sptype) for sptype in sptypes])
+    order = np.argsort(numbers)
+    results = {}
+    for i, name in enumerate(unknowns):
+        ranked = np.argsort(chi2[i])
+        best = np.nonzero(order == ranked[0])[0][0]
+        number = interpolate_type(numbers[order], chi2[i][order], best)
+        results[name] = ([(sptypes[k], chi2[i, k]) for k in ranked], number)
+    return results
+
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from spectrum_store import open_store
+    from spectrum_source import open_source
+    from cflib_stars import starfilelist, stdfilelist
+
+    parser = argparse.ArgumentParser(description= \
+        "Classify the unknown stars of the spectral classification lab against the standards.")
+    parser.add_argument('directory', help="directory or url of CF library FITS spectra")
+    parser.add_argument('--width', type=float, default=4, help="bin width in Angstroms (default 4)")
+    parser.add_argument('--ranks', type=int, default=3, help="number of best standards to list")
+    args = parser.parse_args()
+
+    source = open_source(args.directory)
+    store = open_store(source, starfilelist + stdfilelist)
+    source.close()
+    stdlist = dict(zip([filename_type(std) for std in stdfilelist], stdfilelist))
+
+    tstart = time.perf_counter()
+    results = classify(store, starfilelist, stdlist, args.width)
+    elapsed = time.perf_counter() - tstart
+
+    errors = []
+    for name in starfilelist:
+        ranked, number = results[name]
+        truetype = filename_type(name)
+        errors.append(number - type_number(truetype))
+        best = '  '.join(['%s %.2e' % (sptype, chi2) for sptype, chi2 in ranked[:args.ranks]])
+        print('%-10s true %-3s fit %-3s (%.1f)   %s' % (name.split('.')[1].replace('hd', 'HD '), \
+              truetype, type_name(number), number, best))
+    errors = np.array(errors)
+    print('%d stars: rms error %.1f sub-types, %d within 2 sub-types' % \
+          (len(errors), np.sqrt(np.mean(errors**2)), np.sum(np.abs(errors) <= 2)))
+    print('Classified in %.3f s' % elapsed)
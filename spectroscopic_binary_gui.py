@@ -16,22 +16,13 @@ from matplotlib.backend_bases import key_press_handler
 from matplotlib import pyplot as plt, animation
 #from imageio import imread
 import pandas as pd
+from kepler import kepler_eqn   # vectorized solver for the nonlinear kepler equation
+from scheduler import UpdateScheduler
 
 
 
 ####################################################
 
-# solve the nonlinear kepler equation that relates time and angular position in orbit
-def kepler_eqn(t, period, ecc):
-    E = np.zeros(len(t))
-    for i in range(len(t)):
-        Etmp = 0
-        for j in range(100):  # number of iterations to solve nonlinear eqn
-            Etmp = 2*np.pi*t[i] / period + ecc*np.sin(Etmp)
-        E[i] = Etmp
-    return E
-		
-
 def solve_orbit():
 	global Ntimes, period, ecc, inc, long, theta, t, \
 		xA, yA, xB, yB, centercoord, scale, view
@@ -102,20 +93,11 @@ def plot_orbits():
 	
 
 
-# plot the simulated radial velocity curve
-def plot_radvel():
-	global stvar, period, sysvel, sep, inc, ecc, long, theta, t, KA, KB
+# build the radial velocity figure once; plot_radvel only updates its artists
+def setup_radvel():
+	global rvplot, rvaxes, rvlineA, rvlineB, rvlabelA, rvlabelB, rvsysline, \
+		rvdataA, rvdataB, rvperiod, rvbackground, rvstar, rvlim
 
-	period = slider_period.get()
-	Psec = period * 24*3600
-	vrA = KA * ( np.cos(theta + long*np.pi/180) + ecc*np.cos(long*np.pi/180) )
-	vrB = -KB * ( np.cos(theta + long*np.pi/180) + ecc*np.cos(long*np.pi/180) )
-
-	if KA > KB:
-		vrmax = 40 + np.max(np.abs(vrA))
-	else:
-		vrmax = 40 + np.max(np.abs(vrB))
-		
 	colorA = 'paleturquoise'
 	colorB = 'orangered'
 
@@ -123,83 +105,163 @@ def plot_radvel():
 	f.patch.set_facecolor('lightgray')
 	f.subplots_adjust(left=0.2, bottom=0.2)
 
+	# animated artists change with every slider event and are blitted
+	# over a saved background instead of redrawing the whole figure
 	a = f.add_subplot(111)
-	a.plot(t, vrA + sysvel, color=colorA)
-	a.plot(t, vrB + sysvel, color=colorB)
-	a.text(t[5], vrA[5] + sysvel, '1', color=colorA, fontsize=14)
-	a.text(t[5], vrB[5] + sysvel, '2', color=colorB, fontsize=14)
-	a.plot(t, sysvel + np.zeros(len(t)), 'w:')
+	rvlineA, = a.plot([], [], color=colorA, animated=True)
+	rvlineB, = a.plot([], [], color=colorB, animated=True)
+	rvlabelA = a.text(0, 0, '1', color=colorA, fontsize=14, animated=True)
+	rvlabelB = a.text(0, 0, '2', color=colorB, fontsize=14, animated=True)
+	rvsysline, = a.plot([], [], 'w:', animated=True)
+	
+	# SB2 data only change when a new dataset is selected
+	rvdataA, = a.plot([], [], color=colorA, marker='o', linestyle='None')
+	rvdataB, = a.plot([], [], color=colorB, marker='o', linestyle='None')
+	rvperiod = a.text(.8, .9, '', \
+			   horizontalalignment='right', verticalalignment='top', \
+			   transform=a.transAxes, color='white', fontsize=14)
 	a.set_xlabel('Time (days)')
 	a.set_ylabel('Radial Velocity (km/s')
-	a.set_ylim(-1*vrmax, vrmax)
 	a.set_facecolor("dimgray")   # set color inside axes
-	
-	# plot SB2 data
-	if stvar != '(none)':
+	rvaxes = a
+
+	rvplot = FigureCanvasTkAgg(f, master=obsframe)
+	rvplot.get_tk_widget().place(relx=0, rely=0)
+	rvplot.mpl_connect('draw_event', save_radvel_background)
+	rvbackground = None
+	rvstar = None   # SB2 dataset currently shown
+	rvlim = None    # current axis limits
+
+
+# after every full redraw, save the static layer and draw the animated artists on top
+def save_radvel_background(event):
+	global rvbackground
+	rvbackground = rvplot.copy_from_bbox(rvplot.figure.bbox)
+	draw_radvel_curves()
+
+
+def draw_radvel_curves():
+	for artist in [rvsysline, rvlineA, rvlineB, rvlabelA, rvlabelB]:
+		rvaxes.draw_artist(artist)
+
+
+# read the SB2 data for a dataset once and keep it for later redraws
+def get_sb2data(stvar):
+	if stvar not in sb2cache:
 		phA = pd.to_numeric(ds[stvar]['Phase_A'])
 		phB = pd.to_numeric(ds[stvar]['Phase_B'])
 		vA = pd.to_numeric(ds[stvar]['V_A (km/s)'])
 		vB = pd.to_numeric(ds[stvar]['V_B (km/s)'])
 		Pbinary = pd.to_numeric(ds[stvar]['Period'][0])
-		tA = phA * Pbinary
-		tB = phB * Pbinary
-		a.plot(tA, vA, color=colorA, marker='o', linestyle='None')
-		a.plot(tB, vB, color=colorB, marker='o', linestyle='None')
-		a.text(.8, .9, 'P = '+str(np.round(Pbinary, 2))+' d', \
-			   horizontalalignment='right', verticalalignment='top', \
-			   transform=a.transAxes, color='white', fontsize=14)
-	
+		tA = np.array(phA * Pbinary)
+		tB = np.array(phB * Pbinary)
+		sb2cache[stvar] = (tA, np.array(vA), tB, np.array(vB), Pbinary)
+	return sb2cache[stvar]
+
+
+# plot the simulated radial velocity curve
+def plot_radvel():
+	global stvar, period, sysvel, sep, inc, ecc, long, theta, t, KA, KB, \
+		rvstar, rvlim
+
+	period = slider_period.get()
+	Psec = period * 24*3600
+	vrA = KA * ( np.cos(theta + long*np.pi/180) + ecc*np.cos(long*np.pi/180) )
+	vrB = -KB * ( np.cos(theta + long*np.pi/180) + ecc*np.cos(long*np.pi/180) )
+
+	# round the axis range up to 10 km/s so small slider changes can be blitted
+	if KA > KB:
+		vrmax = 10*np.ceil( (40 + np.max(np.abs(vrA))) / 10 )
+	else:
+		vrmax = 10*np.ceil( (40 + np.max(np.abs(vrB))) / 10 )
+
+	rvlineA.set_data(t, vrA + sysvel)
+	rvlineB.set_data(t, vrB + sysvel)
+	rvlabelA.set_position((t[5], vrA[5] + sysvel))
+	rvlabelB.set_position((t[5], vrB[5] + sysvel))
+	rvsysline.set_data(t, sysvel + np.zeros(len(t)))
 	
-	plot = FigureCanvasTkAgg(f, master=obsframe)
-	plot.draw()
-	plot.get_tk_widget().place(relx=0, rely=0)	
+	# plot SB2 data
+	newstar = stvar != rvstar
+	if newstar:
+		if stvar != '(none)':
+			tA, vA, tB, vB, Pbinary = get_sb2data(stvar)
+			rvdataA.set_data(tA, vA)
+			rvdataB.set_data(tB, vB)
+			rvperiod.set_text('P = '+str(np.round(Pbinary, 2))+' d')
+		else:
+			rvdataA.set_data([], [])
+			rvdataB.set_data([], [])
+			rvperiod.set_text('')
+		rvstar = stvar
+
+	# time axis covers the model curve and any SB2 data, with 5% margins
+	tmin = 0
+	tmax = t[-1]
+	if stvar != '(none)':
+		tA, vA, tB, vB, Pbinary = get_sb2data(stvar)
+		tmin = np.min([tmin, np.min(tA), np.min(tB)])
+		tmax = np.max([tmax, np.max(tA), np.max(tB)])
+	tmargin = 0.05 * (tmax - tmin)
+	lim = (tmin - tmargin, tmax + tmargin, -1*vrmax, vrmax)
+
+	if newstar or lim != rvlim or rvbackground is None:
+		# axes changed, so redraw everything and save a new background
+		rvaxes.set_xlim(lim[0], lim[1])
+		rvaxes.set_ylim(lim[2], lim[3])
+		rvlim = lim
+		rvplot.draw()
+	else:
+		rvplot.restore_region(rvbackground)
+		draw_radvel_curves()
+		rvplot.blit(rvplot.figure.bbox)
 	
 	
 def set_period(value):
 	global period
 	period = slider_period.get()
-	plot_all()
+	redraw.request()
 
 def set_sysvel(value):
 	global sysvel
 	sysvel = slider_sysvel.get()
-	plot_all()
+	redraw.request()
 
 	
 def set_ecc(value):
 	global ecc
 	ecc = slider_ecc.get()
-	plot_all()
+	redraw.request()
 
 	
 def set_long(value):
 	global long
 	long = slider_long.get()
-	plot_all()
+	redraw.request()
 
 	
 def set_inc(value):
 	global inc
 	inc = slider_inc.get()
-	plot_all()
+	redraw.request()
 	
 
 def set_KA(value):
 	global KA
 	KA = slider_KA.get()
-	plot_all()
+	redraw.request()
 	
 
 def set_KB(value):
 	global KB
 	KB = slider_KB.get()
-	plot_all()	
+	redraw.request()	
 	
 
 def set_view(value):
 	global view
 	view = slider_view.get()
-	plot_all()
+	redraw.request()
 	
 
 def plot_all():
@@ -249,6 +311,9 @@ frameheight = 800
 framewidth = frameheight
 window.geometry(str(framewidth)+'x'+str(frameheight))
 
+# merge bursts of slider events into one redraw per frame
+redraw = UpdateScheduler(window, plot_all)
+
 
 # frame to display menu options
 menuframe = tk.Frame(window, width=framewidth/2, height=frameheight)
@@ -422,6 +487,8 @@ stvar = '(none)'
 
 
 # initiate plots with default settings
+sb2cache = {}
+setup_radvel()
 get_current_settings()
 solve_orbit()
 plot_orbits()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Where the spectral classification simulations get their spectra from.
+
+A LocalSource reads spectra from a directory, e.g. a personal copy of the
+Indo-US library.  A MirrorSource downloads them from a web server into a local
+mirror (a UrlCache) the first time they are needed, and prefetch() downloads a
+whole list of spectra in parallel in the background, so only the first plot
+of each spectrum waits for the network and the simulation keeps working
+offline once the mirror is complete.  open_source() picks the right one from a
+directory name or url.
+
+Both FITS spectra (as used by spec_class_v5.py) and the library's text files
+(as used by spec_class_v3.py) can be read.
+"""
+
+import os
+import numpy as np
+from astropy.io import fits
+from url_cache import UrlCache, Prefetcher
+
+
+cachedir = os.path.join(os.path.expanduser('~'), '.introastrosim', 'cflib')
+text_header = 32    # header lines at the top of the library's text files
+
+
+
+# wavelength (Angstroms) and flux of a spectrum in a FITS or text file
+def read_spectrum(filename):
+    if filename.endswith('.txt'):
+        data = np.loadtxt(filename, skiprows=text_header, usecols=(0, 1))
+        return data[:, 0], data[:, 1]
+    with fits.open(filename) as spec:
+        w0 = spec[0].header['CRVAL1']
+        dw = spec[0].header['CDELT1']
+        flux = spec[0].data
+    return w0 + dw*np.arange(len(flux)), flux
+
+
+# spectra in a local directory
+class LocalSource:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    # time of the last change to a spectrum, to tell when a SpectrumStore is out of date
+    def modified(self, name):
+        return os.path.getmtime(self.path(name))
+
+    def prefetch(self, names):
+        pass
+
+    def spectrum(self, name):
+        return read_spectrum(self.path(name))
+
+    def close(self):
+        pass
+
+
+# spectra on a web server, mirrored into the files subdirectory of a local directory
+class MirrorSource:
+    def __init__(self, url, directory=cachedir, workers=8, max_bytes=500e6, timeout=30):
+        self.url = url
+        self.directory = directory
+        self.cache = UrlCache(os.path.join(directory, 'files'), max_bytes, timeout)
+        self.prefetcher = Prefetcher(self.cache, workers)
+
+    # local path of a spectrum, downloading it first if necessary
+    def path(self, name):
+        url = self.url + name
+        pending = self.prefetcher.pending.get(url)
+        if pending is not None and not pending.cancelled():
+            try:
+                return pending.result()    # already being downloaded
+            except OSError:
+                pass                       # try again below
+        return self.cache.fetch(url)
+
+    # the library files on the server are never changed
+    def modified(self, name):
+        return 0
+
+    # start downloading spectra in the background
+    def prefetch(self, names):
+        self.prefetcher.prefetch([self.url + name for name in names])
+
+    def spectrum(self, name):
+        return read_spectrum(self.path(name))
+
+    def close(self):
+        self.prefetcher.shutdown()
+
+
+# MirrorSource for a url, LocalSource for a directory
+def open_source(location, directory=cachedir, workers=8):
+    if location.startswith(('http://', 'https://')):
+        return MirrorSource(location, directory, workers)
+    return LocalSource(location)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single-file store of the Indo-US library spectra used by spec_class_v5.py.
+
+All CF library spectra share one wavelength grid, so every spectrum can be kept
+as one row of a 2-D array (spectra x wavelength).  build_store() reads the FITS
+files once and writes the array as a .npy file plus a small .json index.
+SpectrumStore memory-maps the array, so selecting a star is a row view of the
+file rather than a new read, and binned versions of the spectra are computed
+once and kept in memory.  open_store() rebuilds the store whenever a FITS
+file is added or changed.  The FITS files can come from a local directory or
+a web mirror (see spectrum_source.py).  Stores are kept in a per-user cache,
+so the library itself may be read-only; if no store can be written, the FITS
+files are read into memory instead.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from astropy.io import fits
+from spectrum_source import LocalSource
+
+
+storedir = os.path.join(os.path.expanduser('~'), '.introastrosim', 'cflib_store')
+
+
+# default location of the store for a source: one subdirectory of storedir per
+# source directory, named after it and a hash of its full path
+def store_path(source):
+    directory = os.path.abspath(source.directory)
+    name = os.path.basename(directory) + '_' + \
+        hashlib.sha256(directory.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(storedir, name, 'cflib_store')
+
+
+# read the FITS spectra in filenames from a source into one array, written to
+# path.npy if path is given and kept in memory otherwise.  Returns the index
+# (wavelength grid and filenames) and the array.
+def read_spectra(source, filenames, path=None):
+    filenames = list(dict.fromkeys(filenames))   # drop duplicates, keep order
+    source.prefetch(filenames)
+    data = None
+    for i, name in enumerate(filenames):
+        with fits.open(source.path(name)) as spec:
+            w0 = spec[0].header['CRVAL1']
+            dw = spec[0].header['CDELT1']
+            Nw = spec[0].header['NAXIS1']
+            if data is None:
+                grid = (w0, dw, Nw)
+                shape = (len(filenames), Nw)
+                if path is None:
+                    data = np.zeros(shape, dtype=np.float32)
+                else:
+                    data = np.lib.format.open_memmap(path + '.npy', mode='w+', \
+                                                     dtype=np.float32, shape=shape)
+            elif (w0, dw, Nw) != grid:
+                raise ValueError(name + ' is not on the same wavelength grid as ' + filenames[0])
+            data[i] = spec[0].data
+
+    index = {'CRVAL1': grid[0], 'CDELT1': grid[1], 'NAXIS1': grid[2], \
+             'files': filenames}
+    return index, data
+
+
+# read the FITS spectra in filenames from a source and save them to path.npy/path.json
+def build_store(source, filenames, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # the index is removed first and written last, so an interrupted build is redone next time
+    if os.path.exists(path + '.json'):
+        os.remove(path + '.json')
+    index, data = read_spectra(source, filenames, path)
+    data.flush()
+    del data
+    with open(path + '.json', 'w') as f:
+        json.dump(index, f, indent=1)
+
+
+# mean flux in wavelength bins with the given edges, for one spectrum or a 2-D
+# array of spectra; same result as scipy.stats.binned_statistic(statistic='mean')
+def bin_spectra(w, flux, edges):
+    flux = np.atleast_2d(flux)
+    start = np.searchsorted(w, edges[:-1], side='left')
+    end = np.searchsorted(w, edges[1:], side='left')
+    end[-1] = np.searchsorted(w, edges[-1], side='right')   # last bin includes its right edge
+    counts = end - start
+
+    # reduceat sums from each start index to the next one; a zero column after
+    # the last bin ends the final sum there
+    section = np.concatenate([flux[:, :end[-1]], np.zeros((len(flux), 1))], axis=1)
+    sums = np.add.reduceat(section, np.minimum(start, end[-1]), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+# spectra saved at path, or (if path is None) an index and array from read_spectra()
+class SpectrumStore:
+    def __init__(self, path, index=None, data=None):
+        if path is not None:
+            with open(path + '.json') as f:
+                index = json.load(f)
+            data = np.load(path + '.npy', mmap_mode='r')
+        self.files = index['files']
+        self.rows = dict(zip(self.files, range(len(self.files))))
+        w0 = index['CRVAL1']
+        dw = index['CDELT1']
+        Nw = index['NAXIS1']
+        self.wavelength = w0 + dw*np.arange(Nw)
+        self.data = data
+        self.binned_cache = {}
+
+    def __contains__(self, filename):
+        return filename in self.rows
+
+    # flux of one spectrum, as a view into the memory-mapped array
+    def spectrum(self, filename):
+        return self.data[self.rows[filename]]
+
+    # all spectra binned to a lower resolution; computed once per bin width.
+    # Returns the bin edges and an array of binned spectra (spectra x bins).
+    def binned_all(self, width=4, wmin=3900, wmax=7100):
+        key = (width, wmin, wmax)
+        if key not in self.binned_cache:
+            edges = np.arange(wmin, wmax, width)
+            self.binned_cache[key] = (edges, bin_spectra(self.wavelength, self.data, edges))
+        return self.binned_cache[key]
+
+    # bin edges and binned flux of one spectrum
+    def binned(self, filename, width=4, wmin=3900, wmax=7100):
+        edges, binned = self.binned_all(width, wmin, wmax)
+        return edges, binned[self.rows[filename]]
+
+
+# open the store at path (default: see store_path), building it first if it is
+# missing, lacks any of filenames, or is older than any of the FITS files.
+# source is a spectrum source or a directory name.  If the store cannot be
+# written, the spectra are read directly from the FITS files into memory.
+def open_store(source, filenames, path=None):
+    if isinstance(source, str):
+        source = LocalSource(source)
+    if path is None:
+        path = store_path(source)
+
+    rebuild = not (os.path.exists(path + '.npy') and os.path.exists(path + '.json'))
+    if not rebuild:
+        with open(path + '.json') as f:
+            stored = set(json.load(f)['files'])
+        built = os.path.getmtime(path + '.npy')
+        rebuild = not set(filenames) <= stored or \
+            any([source.modified(name) > built for name in filenames])
+
+    if rebuild:
+        try:
+            build_store(source, filenames, path)
+        except OSError:    # e.g. no write access
+            return SpectrumStore(None, *read_spectra(source, filenames))
+    return SpectrumStore(path)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Automatic sunspot detection and tracking for the Rotation of the Sun lab.
+
+For every day in a date range, the HMI continuum image is loaded (from the
+local image cache used by solar_rotation_v4.py, or from a directory of saved
+images), the solar disk is fit, and dark spots are found by comparing each
+pixel with the average brightness at the same distance from disk center
+(which removes limb darkening).  Connected groups of dark pixels are labelled
+as spots and converted to latitude and longitude with the same approximate
+formula as the simulation.  Spots are then linked from day to day and the
+drift in longitude gives the rotation period of the Sun.
+
+Days are processed in parallel, e.g.
+    python sunspots.py 2024-05-01 2024-05-31
+    python sunspots.py 2024-05-01 2024-05-31 --local-dir ./sdo_images
+"""
+
+import datetime as dt
+import numpy as np
+from scipy import ndimage
+from imageio.v2 import imread
+from concurrent.futures import ProcessPoolExecutor
+from sdo_images import sdo_url, sdo_filename, fit_limb, heliographic, cachedir
+from url_cache import UrlCache
+
+
+synodic_rate = 13.2    # approximate drift of sunspots in longitude (deg/day)
+
+
+
+# find dark spots on the disk; returns arrays of x, y (pixels), area (pixels),
+# latitude and longitude (degrees) for each spot
+def detect_spots(im, geometry, threshold=0.85, min_area=4, rmax=0.95):
+    if im.ndim == 3:
+        im = im[:, :, 0]
+    im = im.astype(float)
+    xcent, ycent, pixrad = geometry
+
+    # average brightness in rings of 1 pixel width around disk center
+    ny, nx = im.shape
+    yy, xx = np.mgrid[0:ny, 0:nx]
+    r = np.hypot(xx - xcent, yy - ycent)
+    ring = np.rint(r).astype(int)
+    ondisk = r < rmax*pixrad
+    counts = np.bincount(ring[ondisk], minlength=ring.max()+1)
+    sums = np.bincount(ring[ondisk], weights=im[ondisk], minlength=ring.max()+1)
+    profile = sums / np.maximum(counts, 1)
+
+    # spots are connected regions well below the local average
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dark = ondisk & (im < threshold*profile[ring])
+    labels, nspots = ndimage.label(dark)
+    area = np.bincount(labels.ravel(), minlength=nspots+1)[1:]
+    weight = np.maximum(profile[ring] - im, 0) * dark   # weight by darkness
+    wsum = np.bincount(labels.ravel(), weights=weight.ravel(), minlength=nspots+1)[1:]
+    xsum = np.bincount(labels.ravel(), weights=(weight*xx).ravel(), minlength=nspots+1)[1:]
+    ysum = np.bincount(labels.ravel(), weights=(weight*yy).ravel(), minlength=nspots+1)[1:]
+
+    keep = (area >= min_area) & (wsum > 0)
+    x = xsum[keep] / wsum[keep]
+    y = ysum[keep] / wsum[keep]
+    latitude, longitude = heliographic(x, y, xcent, ycent, pixrad)
+    return {'x': x, 'y': y, 'area': area[keep], \
+            'latitude': latitude, 'longitude': longitude}
+
+
+# load one day's image, fit the disk and detect spots; runs in a worker process
+def process_day(t, directory=None, threshold=0.85, min_area=4):
+    try:
+        if directory is None:
+            im = imread(UrlCache(cachedir).fetch(sdo_url(t)))
+        else:
+            im = imread(sdo_filename(t, directory))
+    except (OSError, ValueError):   # no image for this date
+        return t, None
+    try:
+        geometry = fit_limb(im)
+        return t, detect_spots(im, geometry, threshold, min_area)
+    except ValueError:   # no solar disk, e.g. a blank frame from a data gap
+        return t, None
+
+
+# detect spots on every day from start to end (inclusive), in parallel
+def process_days(start, end, directory=None, workers=None, threshold=0.85, min_area=4):
+    days = [start + dt.timedelta(days=i) for i in range((end - start).days + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(process_day, days, [directory]*len(days), \
+                                [threshold]*len(days), [min_area]*len(days)))
+    return [(t, spots) for t, spots in results if spots is not None]
+
+
+# link spots from day to day: each spot continues the track whose predicted
+# position (shifted by the rotation rate) is closest within the tolerances
+def track_spots(results, rate=synodic_rate, lattol=3, lontol=6, maxgap=2):
+    tracks = []     # each track is a list of (day, latitude, longitude, area)
+    if len(results) == 0:
+        return tracks
+    t0 = results[0][0]
+    for t, spots in results:
+        day = (t - t0).days
+        open_tracks = [tr for tr in tracks if 0 < day - tr[-1][0] <= maxgap]
+        used = set()
+        for i in np.argsort(-spots['area']):    # largest spots first
+            lat = spots['latitude'][i]
+            lon = spots['longitude'][i]
+            best = None
+            bestdist = np.inf
+            for k, tr in enumerate(open_tracks):
+                if k in used:
+                    continue
+                pday, plat, plon, parea = tr[-1]
+                dlat = abs(lat - plat)
+                dlon = abs(lon - (plon + rate*(day - pday)))
+                if dlat < lattol and dlon < lontol and dlat + dlon < bestdist:
+                    best = k
+                    bestdist = dlat + dlon
+            point = (day, lat, lon, spots['area'][i])
+            if best is None:
+                tracks.append([point])
+            else:
+                open_tracks[best].append(point)
+                used.add(best)
+    return tracks
+
+
+# synodic and sidereal rotation periods (days) from the longitude drift of
+# every track seen on at least minpoints days
+def rotation_period(tracks, minpoints=3):
+    rates = []
+    weights = []
+    for tr in tracks:
+        if len(tr) < minpoints:
+            continue
+        days = np.array([p[0] for p in tr])
+        lon = np.array([p[2] for p in tr])
+        rates.append(np.polyfit(days, lon, 1)[0])
+        weights.append(len(tr))
+    if len(rates) == 0:
+        return np.nan, np.nan, 0
+    rate = np.average(rates, weights=weights)
+    synodic = 360 / rate
+    sidereal = 1 / (1/synodic + 1/365.25)
+    return synodic, sidereal, len(rates)
+
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description= \
+        "Find sunspots in SDO/HMI images over a range of dates and estimate the Sun's rotation period.")
+    parser.add_argument('start', help="first date, YYYY-MM-DD")
+    parser.add_argument('end', help="last date, YYYY-MM-DD")
+    parser.add_argument('--local-dir', default=None, \
+                        help="directory of saved images, instead of downloading them")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--threshold', type=float, default=0.85, \
+                        help="spot pixels are darker than this fraction of the local disk brightness")
+    parser.add_argument('--min-area', type=int, default=4, help="smallest spot, in pixels")
+    args = parser.parse_args()
+
+    tstart = time.perf_counter()
+    start = dt.date.fromisoformat(args.start)
+    end = dt.date.fromisoformat(args.end)
+    results = process_days(start, end, args.local_dir, args.workers, \
+                           args.threshold, args.min_area)
+    for t, spots in results:
+        print(t.strftime('%Y-%m-%d') + ': %d spots' % len(spots['x']))
+        for lat, lon, area in zip(spots['latitude'], spots['longitude'], spots['area']):
+            print('    latitude % 6.2f   longitude % 7.2f   area %d' % (lat, lon, area))
+
+    tracks = track_spots(results)
+    synodic, sidereal, ntracks = rotation_period(tracks)
+    print('%d images, %d spot tracks used' % (len(results), ntracks))
+    print('Synodic rotation period:  %.2f days' % synodic)
+    print('Sidereal rotation period: %.2f days' % sidereal)
+    print('Finished in %.1f s' % (time.perf_counter() - tstart))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests of the spectrum store (spectrum_store.py) built from a web mirror
+(spectrum_source.py) of a few small generated FITS spectra, served by a local
+web server (see conftest.py).  Run with
+    python -m pytest test_spectrum_store.py
+"""
+
+import numpy as np
+from astropy.io import fits
+from scipy.stats import binned_statistic
+from spectrum_source import MirrorSource, read_spectrum
+from spectrum_store import open_store
+
+
+names = ['A0V.hd1.fits', 'G2V.hd2.fits', 'M0V.hd3.fits']
+
+
+
+# write spectra on the CF library's wavelength grid (3460-9464 A) to directory
+def write_spectra(directory, seed=0):
+    rng = np.random.default_rng(seed)
+    for name in names:
+        hdu = fits.PrimaryHDU(rng.uniform(0.5, 1.5, 15011).astype(np.float32))
+        hdu.header['CRVAL1'] = 3460.
+        hdu.header['CDELT1'] = 0.4
+        hdu.writeto(str(directory / name))
+
+
+def test_store_from_mirror(server, tmp_path):
+    url, served, requests = server
+    write_spectra(served)
+    source = MirrorSource(url, str(tmp_path / 'mirror'))
+    store = open_store(source, names, str(tmp_path / 'store' / 'cflib_store'))
+    assert sorted(requests) == ['/' + name for name in names]
+
+    # each spectrum is only downloaded once
+    source.prefetch(names)
+    store = open_store(source, names, str(tmp_path / 'store' / 'cflib_store'))
+    source.close()
+    assert len(requests) == len(names)
+
+    for name in names:
+        w, flux = read_spectrum(str(served / name))
+        assert np.array_equal(store.spectrum(name), flux)
+        edges, binned = store.binned(name, width=4)
+        expected = binned_statistic(w, flux, statistic='mean', bins=edges)[0]
+        assert np.allclose(binned, expected, equal_nan=True)
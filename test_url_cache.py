@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests of the download cache (url_cache.py) against a local web server
+serving a temporary directory (see conftest.py).  Run with
+    python -m pytest test_url_cache.py
+"""
+
+import os
+import time
+import urllib.error
+import datetime as dt
+import pytest
+from url_cache import UrlCache, Prefetcher
+from sdo_images import neighbour_urls
+
+
+
+def test_fetch_downloads_once(server, tmp_path):
+    url, served, requests = server
+    cache = UrlCache(str(tmp_path / 'cache'))
+    path = cache.fetch(url + 'a.jpg')
+    assert open(path, 'rb').read() == (served / 'a.jpg').read_bytes()
+    assert url + 'a.jpg' in cache
+    assert cache.fetch(url + 'a.jpg') == path
+    assert len(requests) == 1
+
+
+def test_evicts_least_recently_used(server, tmp_path):
+    url, served, requests = server
+    cache = UrlCache(str(tmp_path / 'cache'), max_bytes=2500)
+    first = cache.fetch(url + 'a.jpg')
+    os.utime(first, (0, 0))    # make the first file clearly the oldest
+    cache.fetch(url + 'b.jpg')
+    cache.fetch(url + 'c.jpg')
+    assert url + 'a.jpg' not in cache
+    assert url + 'b.jpg' in cache and url + 'c.jpg' in cache
+    assert cache.size() <= 2500
+
+
+def test_missing_file(server, tmp_path):
+    url, served, requests = server
+    cache = UrlCache(str(tmp_path / 'cache'))
+    with pytest.raises(urllib.error.HTTPError) as err:
+        cache.fetch(url + 'missing.jpg')
+    assert err.value.code == 404
+    assert url + 'missing.jpg' not in cache
+    assert os.listdir(cache.directory) == []    # no partial download left behind
+
+
+def test_prefetch(server, tmp_path):
+    url, served, requests = server
+    cache = UrlCache(str(tmp_path / 'cache'))
+    prefetcher = Prefetcher(cache)
+    prefetcher.prefetch([url + 'a.jpg', url + 'b.jpg', url + 'missing.jpg'])
+    for future in list(prefetcher.pending.values()):
+        future.exception()    # wait; the missing file is simply not cached
+    prefetcher.shutdown()
+    assert url + 'a.jpg' in cache and url + 'b.jpg' in cache
+    assert url + 'missing.jpg' not in cache
+
+
+def test_shutdown_stops_running_downloads(server, tmp_path):
+    url, served, requests = server
+    cache = UrlCache(str(tmp_path / 'cache'))
+    prefetcher = Prefetcher(cache)
+    prefetcher.prefetch([url + 'slow.jpg'])
+    future = prefetcher.pending[url + 'slow.jpg']
+    time.sleep(0.3)
+    tstart = time.perf_counter()
+    prefetcher.shutdown()
+    assert future.exception(timeout=5) is not None
+    assert time.perf_counter() - tstart < 2
+    assert os.listdir(cache.directory) == []
+
+
+def test_neighbours_stop_at_today():
+    today = dt.date(2024, 5, 10)
+    urls = neighbour_urls(dt.datetime(2024, 5, 9), ndays=2, root='', today=today)
+    assert urls == ['2024/05/10/20240510_000000_Ic_1k.jpg', \
+                    '2024/05/08/20240508_000000_Ic_1k.jpg', \
+                    '2024/05/07/20240507_000000_Ic_1k.jpg']
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local disk cache for files that the simulations download from the web.
+
+Each file is stored under a name made from the SHA-256 hash of its URL, so the
+same URL is only ever downloaded once.  When the cache grows beyond max_bytes,
+the least recently used files are deleted.  A Prefetcher downloads files into
+the cache in background threads, e.g. the images for the days before and after
+the one currently shown.
+
+The root of the URLs is not fixed, so the cache can be tried out against a
+local web server (python -m http.server) instead of the real data archive.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+
+# raised by UrlCache.fetch() when a download is stopped before it finishes
+class FetchCancelled(Exception):
+    pass
+
+
+class UrlCache:
+    def __init__(self, directory, max_bytes=200e6, timeout=30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.timeout = timeout     # seconds to wait for the server
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # local filename for a url; keeps the extension so readers can tell the file type
+    def path(self, url):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        ext = os.path.splitext(url.split('?')[0])[1]
+        return os.path.join(self.directory, name + ext)
+
+    def __contains__(self, url):
+        return os.path.exists(self.path(url))
+
+    # return the local path for a url, downloading it first if necessary.
+    # cancelled is an optional function checked between chunks of the download;
+    # when it returns True the download stops with FetchCancelled.
+    def fetch(self, url, cancelled=None, chunksize=65536):
+        path = self.path(url)
+        if os.path.exists(path):
+            os.utime(path)    # mark as recently used
+            return path
+
+        # write to a temporary file first so a partial download is never used
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f, \
+                 urllib.request.urlopen(url, timeout=self.timeout) as u:
+                while True:
+                    if cancelled is not None and cancelled():
+                        raise FetchCancelled(url)
+                    chunk = u.read1(chunksize)    # whatever has arrived, up to chunksize
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmpname)
+            raise
+        os.replace(tmpname, path)
+        self.evict(keep=path)
+        return path
+
+    # delete the least recently used files until the cache fits in max_bytes
+    def evict(self, keep=None):
+        with self.lock:
+            files = []
+            for name in os.listdir(self.directory):
+                if name.endswith('.part'):
+                    continue
+                fullname = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(fullname)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, fullname))
+
+            total = sum([f[1] for f in files])
+            for mtime, size, fullname in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if fullname == keep:
+                    continue
+                try:
+                    os.remove(fullname)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def size(self):
+        return sum([os.path.getsize(os.path.join(self.directory, name)) \
+                    for name in os.listdir(self.directory)])
+
+
+# download urls into a UrlCache in the background
+class Prefetcher:
+    def __init__(self, cache, workers=2):
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+        self.stopped = threading.Event()   # set by shutdown() to stop running downloads
+
+    def prefetch(self, urls):
+        for url in urls:
+            if url in self.pending and not self.pending[url].done():
+                continue
+            if url in self.cache:
+                continue
+            self.pending[url] = self.pool.submit(self.cache.fetch, url, self.stopped.is_set)
+
+        # forget finished downloads; missing files are simply not cached
+        for url in [u for u, f in self.pending.items() if f.done()]:
+            del self.pending[url]
+
+    # drop any downloads that have not started yet
+    def cancel(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+
+    # drop the downloads that have not started and stop the ones that have
+    def shutdown(self):
+        self.stopped.set()
+        self.cancel()
+        self.pool.shutdown(wait=False)
@@ -15,6 +15,7 @@ from matplotlib import pyplot as plt
 #from imageio import imread
 import pandas as pd
 import lightkurve as lk
+from scheduler import UpdateScheduler
 
 
 def set_star(option):
@@ -26,12 +27,12 @@ def set_star(option):
 def set_period(value): 
 	global period
 	period = slider_period.get()
-	plot_folded()
+	redraw.request()
 
 def set_phshift(value): 
 	global phshift
 	phshift = slider_phshift.get()
-	plot_folded()	
+	redraw.request()	
 
 
 # plot the full lightcurve
@@ -101,6 +102,9 @@ framewidth = 800
 frameheight = 600
 window.geometry(str(framewidth)+'x'+str(frameheight))
 
+# merge bursts of slider events into one redraw per frame
+redraw = UpdateScheduler(window, plot_folded)
+
 # create full lightcurve panel
 lc_frame = tk.Frame(window, width=framewidth, height=frameheight/2)
 lc_frame.grid_propagate(0)